@@ -4,11 +4,11 @@ import pandas as pd
 import ta
 
 from signals import rsi_signals, macd_signals, bbands_signals, obv_signals, atr_breakout_signals, adx_signals
-from metrics import annualized_sharpe, annualized_calmar, annualized_sortino, win_rate
-from models import Operation, get_portfolio_value
+from metrics import annualized_sharpe, annualized_calmar, annualized_sortino, win_rate, trade_statistics
+from models import Operation, get_portfolio_value, TradeLedger, LONG, SHORT, EXIT_SL, EXIT_TP, EXIT_END
 
 
-def backtest(data, trial, params=None) -> float:
+def backtest(data, trial, params=None, ledger: TradeLedger = None, periods: float = 8760) -> float:
     # --- Preparación inicial del DataFrame ---
     # Copia el DataFrame para evitar modificar el original.
     # Convierte la columna 'timestamp' a formato datetime y establece el índice temporal.
@@ -115,9 +115,12 @@ def backtest(data, trial, params=None) -> float:
     active_short_positions: list[Operation] = []
     # Lista para almacenar el valor total del portafolio en cada paso.
     portfolio_value = [cash]
+    # Registro de todas las aperturas y cierres (si no se recibe uno, se usa uno interno).
+    if ledger is None:
+        ledger = TradeLedger()
 
     # --- Iteración sobre cada fila del histórico para simular operaciones ---
-    for row in historic.itertuples(index=False):
+    for bar, row in enumerate(historic.itertuples(index=False)):
 
         # --- Cierre de posiciones LONG ---
         # Se verifica si el precio actual alcanza el stop loss o take profit para cerrar la posición.
@@ -125,7 +128,11 @@ def backtest(data, trial, params=None) -> float:
         for position in active_long_positions[:]: # Iterate over a copy of the list
             if position.stop_loss > row.Close  or position.take_profit < row.Close:
                 # Close the position
-                cash += row.Close * position.n_shares * (1 - COM)
+                cash_in = row.Close * position.n_shares * (1 - COM)
+                cash += cash_in
+                ledger.close(position.trade_id, bar, row.Close,
+                             EXIT_SL if position.stop_loss > row.Close else EXIT_TP,
+                             cash_in - position.price * position.n_shares * (1 + COM))
                 # Remove the position from active positions
                 active_long_positions.remove(position)
 
@@ -135,7 +142,11 @@ def backtest(data, trial, params=None) -> float:
         for position in active_short_positions[:]:  # Iterate over a copy of the list
             if position.stop_loss < row.Close or position.take_profit > row.Close:
                 # Close the position
-                cash += ((position.price * position.n_shares) + (position.price * n_shares - row.Close * position.n_shares))*(1 - COM)
+                cash_in = ((position.price * position.n_shares) + (position.price * n_shares - row.Close * position.n_shares))*(1 - COM)
+                cash += cash_in
+                ledger.close(position.trade_id, bar, row.Close,
+                             EXIT_SL if position.stop_loss < row.Close else EXIT_TP,
+                             cash_in - position.price * position.n_shares * (1 + COM))
                 # Remove the position from active positions
                 active_short_positions.remove(position)
 
@@ -154,7 +165,8 @@ def backtest(data, trial, params=None) -> float:
                     n_shares=n_shares,
                     stop_loss=row.Close * (1 - SL),
                     take_profit=row.Close * (1 + TP),
-                    type='LONG'
+                    type='LONG',
+                    trade_id=ledger.open(bar, row.Close, LONG, n_shares)
                 ))
 
         # --- Apertura de nuevas posiciones SHORT ---
@@ -171,7 +183,8 @@ def backtest(data, trial, params=None) -> float:
                     n_shares = n_shares,
                     stop_loss = row.Close*(1 + SL),
                     take_profit = row.Close * (1 - TP),
-                    type = 'SHORT'
+                    type = 'SHORT',
+                    trade_id = ledger.open(bar, row.Close, SHORT, n_shares)
                 ))
 
         # --- Actualización del valor del portafolio ---
@@ -182,6 +195,18 @@ def backtest(data, trial, params=None) -> float:
         ))
 
     # --- Limpieza de posiciones abiertas al final del backtest ---
+    # Las posiciones que siguen abiertas se registran como cerradas por fin de datos (END)
+    # al último precio, con exit_bar igual al número de velas; no afectan el efectivo.
+    n_bars = len(historic)
+    if n_bars > 0:
+        last_close = historic['Close'].iloc[-1]
+        for position in active_long_positions:
+            ledger.close(position.trade_id, n_bars, last_close, EXIT_END,
+                         last_close * position.n_shares * (1 - COM) - position.price * position.n_shares * (1 + COM))
+        for position in active_short_positions:
+            ledger.close(position.trade_id, n_bars, last_close, EXIT_END,
+                         ((position.price * position.n_shares) + (position.price * n_shares - last_close * position.n_shares)) * (1 - COM)
+                         - position.price * position.n_shares * (1 + COM))
     active_long_positions = []
     active_short_positions = []
 
@@ -200,9 +225,10 @@ def backtest(data, trial, params=None) -> float:
     mean_t = df.rets.mean()
     std_t = df.rets.std()
     values_port = df['value']
-    sharpe_anual = annualized_sharpe(mean=mean_t, std=std_t)
-    calmar = annualized_calmar(mean=mean_t, values=values_port)
-    sortino = annualized_sortino(mean_t, df['rets'])
+    # periods son las velas por año (8760 para velas de 1h; ver resample.bars_per_year para otras temporalidades)
+    sharpe_anual = annualized_sharpe(mean=mean_t, std=std_t, periods=periods)
+    calmar = annualized_calmar(mean=mean_t, values=values_port, periods=periods)
+    sortino = annualized_sortino(mean_t, df['rets'], periods=periods)
     wr = win_rate(df['rets'])
 
     # --- Preparación de resultados ---
@@ -213,6 +239,9 @@ def backtest(data, trial, params=None) -> float:
     results['Calmar'] = calmar
     results['Sortino'] = sortino
     results['Win Rate'] = wr
+    # Estadísticas por operación a partir del registro de operaciones
+    for name, value in trade_statistics(ledger.trades, n_bars).items():
+        results[name] = value
 
     # --- Salida de la función ---
     # Si no se pasan parámetros, se devuelve solo la métrica Calmar para optimización.
@@ -0,0 +1,233 @@
+import json
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorStore
+
+# --- Propósito general del archivo ---
+# Este archivo implementa un servicio local de datos de sólo lectura para varios procesos a la vez.
+# El proceso servidor carga el dataset una sola vez en memoria compartida y publica "vistas" con nombre
+# y versión: el dataset completo, los cortes train/test/validation (que apuntan a la misma memoria,
+# sin copiar) y columnas de indicadores precalculados. Los procesos cliente se conectan por nombre
+# con attach() y obtienen un DataFrame cuyas columnas son vistas directas de la memoria compartida,
+# por lo que N estudios en paralelo usan ~1x la memoria del dataset en lugar de Nx.
+
+# Tamaño del segmento con el manifiesto (índice de vistas publicadas).
+MANIFEST_SIZE = 1 << 20
+# Encabezado del manifiesto: contador de versión (seqlock) y longitud del JSON.
+_HEADER = struct.Struct('QQ')
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    # Se conecta a un segmento existente sin registrarlo en el resource_tracker, que lo borraría
+    # cuando el cliente termina (y los procesos hijos comparten el tracker del padre).
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class DatasetService:
+    '''
+    Servidor de datos en memoria compartida. Sólo este proceso escribe; los clientes usan attach().
+    '''
+
+    def __init__(self, data: pd.DataFrame, prefix: str = 'proyecto2'):
+        # --- Parámetros ---
+        # data: DataFrame ordenado; sólo se publican las columnas numéricas.
+        # prefix: prefijo de los nombres de los segmentos (permite varios servicios en la misma máquina).
+        self.prefix = prefix
+        self._segments = {}
+        self._views = {}
+        self._manifest = shared_memory.SharedMemory(name=f'{prefix}_manifest', create=True, size=MANIFEST_SIZE)
+        _HEADER.pack_into(self._manifest.buf, 0, 0, 0)
+
+        numeric = data.select_dtypes(include='number').reset_index(drop=True)
+        self._base = self._write_segment({col: numeric[col].to_numpy() for col in numeric.columns})
+        self.n_rows = len(numeric)
+        self.publish('data')
+
+    def _write_segment(self, columns: dict) -> dict:
+        # Copia las columnas, una detrás de otra, a un segmento nuevo y devuelve su descripción.
+        arrays = {col: np.ascontiguousarray(values) for col, values in columns.items()}
+        size = max(sum(a.nbytes for a in arrays.values()), 1)
+        name = f'{self.prefix}_{len(self._segments)}'
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._segments[name] = shm
+
+        layout = {}
+        offset = 0
+        for col, values in arrays.items():
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, offset=offset)[:] = values
+            layout[col] = {'segment': name, 'offset': offset, 'dtype': values.dtype.str}
+            offset += values.nbytes
+        return layout
+
+    def _write_manifest(self):
+        # Seqlock: el contador es impar mientras se escribe, así los clientes detectan lecturas a medias.
+        payload = json.dumps(self._views).encode()
+        if len(payload) > MANIFEST_SIZE - _HEADER.size:
+            raise ValueError("El manifiesto excede MANIFEST_SIZE.")
+        seq, _ = _HEADER.unpack_from(self._manifest.buf, 0)
+        _HEADER.pack_into(self._manifest.buf, 0, seq + 1, 0)
+        self._manifest.buf[_HEADER.size:_HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(self._manifest.buf, 0, seq + 2, len(payload))
+
+    def publish(self, name: str, start: int = 0, stop: int = None, columns: dict = None) -> int:
+        """
+        Publica una nueva versión de la vista `name`.
+
+        Args:
+            name: nombre de la vista (por ejemplo 'train' o 'train_indicators').
+            start, stop: rango de filas del dataset base; la vista apunta a la misma memoria (sin copia).
+            columns: si se pasa, diccionario {columna: arreglo} que se copia a un segmento nuevo
+                (por ejemplo, indicadores precalculados); start y stop se ignoran.
+
+        Returns:
+            int: número de versión publicado.
+        """
+        if columns is not None:
+            layout = self._write_segment(columns)
+            start, stop = 0, len(next(iter(columns.values())))
+        else:
+            layout = self._base
+            stop = self.n_rows if stop is None else stop
+
+        versions = self._views.setdefault(name, [])
+        version = len(versions) + 1
+        versions.append({'version': version, 'start': start, 'stop': stop, 'columns': layout})
+        self._write_manifest()
+        return version
+
+    def publish_splits(self, train: int = 60, test: int = 20, validation: int = 20):
+        # Publica train/test/validation con los mismos cortes que split_dfs (el dataset ya está ordenado).
+        assert train + test + validation == 100, "La suma de train, test y validation debe ser 100 exacto."
+        train_corte = int(self.n_rows * train / 100)
+        test_corte = train_corte + int(self.n_rows * test / 100)
+        self.publish('train', 0, train_corte)
+        self.publish('test', train_corte, test_corte)
+        self.publish('validation', test_corte, self.n_rows)
+
+    def close(self):
+        # Libera y borra todos los segmentos; los clientes conectados dejan de poder usarlos.
+        for shm in list(self._segments.values()) + [self._manifest]:
+            shm.close()
+            shm.unlink()
+        self._segments = {}
+
+
+def indicator_columns(data: pd.DataFrame, params: dict) -> dict:
+    """
+    Calcula las columnas de indicadores de un conjunto de parámetros (con IndicatorStore)
+    para publicarlas con DatasetService.publish(name, columns=...).
+    """
+    store = IndicatorStore(data)
+    columns = {}
+    columns['rsi'] = store.rsi(params['rsi_window'])
+    columns['macd'], columns['macd_signal'] = store.macd(params['macd_fast'], params['macd_slow'],
+                                                         params['macd_signal'])
+    columns['bb_lower'], columns['bb_upper'] = store.bbands(params['bb_window'], params['bb_std'])
+    columns['obv'], columns['obv_ma'] = store.obv(params['obv_window'])
+    columns['atr'], columns['rolling_high'], columns['rolling_low'] = store.atr(params['atr_window'])
+    columns['adx'], columns['plus_di'], columns['minus_di'] = store.adx(params['adx_window'])
+    return columns
+
+
+class DatasetView:
+    '''
+    Vista de sólo lectura conectada a la memoria compartida del servicio.
+    `frame` es un DataFrame cuyas columnas apuntan directamente a la memoria compartida.
+    Antes de close() hay que soltar las referencias a `frame` y a sus columnas.
+    '''
+
+    def __init__(self, name: str, version: int, frame: pd.DataFrame, segments: list):
+        self.name = name
+        self.version = version
+        self.frame = frame
+        self._segments = segments
+
+    def close(self):
+        self.frame = None
+        for shm in self._segments:
+            shm.close()
+
+
+def read_manifest(prefix: str = 'proyecto2') -> dict:
+    # Lee el manifiesto del servicio (reintenta si el servidor lo está actualizando).
+    shm = _attach_segment(f'{prefix}_manifest')
+    try:
+        while True:
+            seq, length = _HEADER.unpack_from(shm.buf, 0)
+            payload = bytes(shm.buf[_HEADER.size:_HEADER.size + length])
+            seq_after, _ = _HEADER.unpack_from(shm.buf, 0)
+            if seq % 2 == 0 and seq == seq_after:
+                return json.loads(payload) if length else {}
+            time.sleep(0.001)
+    finally:
+        shm.close()
+
+
+def attach(name: str, version: int = None, prefix: str = 'proyecto2') -> DatasetView:
+    """
+    Se conecta a una vista publicada sin copiar los datos.
+
+    Args:
+        name: nombre de la vista ('data', 'train', 'test', 'validation', ...).
+        version: versión a usar (de 1 a la última publicada); por defecto la más reciente.
+        prefix: prefijo del servicio.
+
+    Returns:
+        DatasetView: vista con el DataFrame de sólo lectura en `frame`.
+    """
+    views = read_manifest(prefix)
+    if name not in views:
+        raise KeyError(f"La vista '{name}' no está publicada.")
+    versions = views[name]
+    if version is None:
+        version = len(versions)
+    elif not 1 <= version <= len(versions):
+        raise KeyError(f"La vista '{name}' no tiene la versión {version}; versiones disponibles: 1 a {len(versions)}.")
+    entry = versions[version - 1]
+    start, stop = entry['start'], entry['stop']
+
+    segments = {}
+    columns = {}
+    for col, info in entry['columns'].items():
+        if info['segment'] not in segments:
+            segments[info['segment']] = _attach_segment(info['segment'])
+        dtype = np.dtype(info['dtype'])
+        array = np.ndarray((stop - start,), dtype=dtype, buffer=segments[info['segment']].buf,
+                           offset=info['offset'] + start * dtype.itemsize)
+        array.flags.writeable = False
+        columns[col] = array
+
+    frame = pd.DataFrame(columns, copy=False)
+    return DatasetView(name, entry['version'], frame, list(segments.values()))
+
+
+# --- Ejecución del script ---
+# Publica el dataset y sus cortes train/test/validation y mantiene el servicio vivo hasta Ctrl+C.
+# Los estudios en otros procesos usan, por ejemplo: train_df = attach('train').frame
+if __name__ == "__main__":
+    data = pd.read_csv("Binance_BTCUSDT_1h.csv").dropna()
+    data = data.sort_values("timestamp").reset_index(drop=True)
+
+    service = DatasetService(data)
+    service.publish_splits(train=60, test=20, validation=20)
+    print("Vistas publicadas:", ", ".join(read_manifest(service.prefix)))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorStore, combined_signals
+from metrics import annualized_sharpe, annualized_calmar, annualized_sortino, win_rate, trade_statistics
+from models import TradeLedger, LONG, SHORT, EXIT_SL, EXIT_TP, EXIT_END
+
+# --- Propósito general del archivo ---
+# Este archivo implementa un motor de simulación rápido que reproduce exactamente la lógica de backtest().
+# En lugar de iterar un DataFrame con itertuples y crear objetos Operation, recorre arreglos de NumPy
+# y guarda las posiciones abiertas como tuplas. Las operaciones aritméticas se hacen en el mismo orden
+# que en backtest(), por lo que los valores del portafolio coinciden bit a bit con la versión original.
+
+# Costo por operación (comisión) y capital inicial, iguales a los de backtest().
+COM = 0.125 / 100
+INITIAL_CASH = 1_000_000
+
+
+class EngineState:
+    '''
+    Estado de la simulación: efectivo disponible, posiciones abiertas, velas procesadas
+    y, opcionalmente, el registro de operaciones.
+    Cada posición es una tupla (price, n_shares, stop_loss, take_profit, trade_id).
+    '''
+
+    def __init__(self, cash: float = INITIAL_CASH, ledger: TradeLedger = None):
+        self.cash = cash
+        self.long_positions = []
+        self.short_positions = []
+        self.bar = 0
+        self.ledger = ledger
+
+
+def simulate(close, buy_signal, sell_signal, params: dict, state: EngineState = None):
+    """
+    Simula la estrategia barra por barra con las mismas reglas que backtest().
+
+    Args:
+        close: arreglo con los precios de cierre.
+        buy_signal, sell_signal: arreglos booleanos con las señales finales.
+        params: diccionario con 'stop_loss', 'take_profit' y 'n_shares'.
+        state: estado inicial; si es None se inicia con el capital inicial y sin posiciones.
+
+    Returns:
+        tuple: (values, state) con el valor del portafolio después de cada barra y el estado final.
+    """
+    if state is None:
+        state = EngineState()
+
+    SL = params['stop_loss']
+    TP = params['take_profit']
+    n_shares = params['n_shares']
+
+    cash = state.cash
+    longs = state.long_positions
+    shorts = state.short_positions
+    ledger = state.ledger
+    values = []
+
+    # Se convierten a listas de Python para recorrerlas sin el costo de indexar arreglos de NumPy.
+    for bar, price, buy, sell in zip(range(state.bar, state.bar + len(close)),
+                                     np.asarray(close, dtype=float).tolist(),
+                                     np.asarray(buy_signal).tolist(),
+                                     np.asarray(sell_signal).tolist()):
+
+        # --- Cierre de posiciones LONG (stop loss o take profit) ---
+        if longs:
+            keep = []
+            for position in longs:
+                if position[2] > price or position[3] < price:
+                    cash_in = price * position[1] * (1 - COM)
+                    cash += cash_in
+                    if ledger is not None:
+                        ledger.close(position[4], bar, price, EXIT_SL if position[2] > price else EXIT_TP,
+                                     cash_in - position[0] * position[1] * (1 + COM))
+                else:
+                    keep.append(position)
+            longs = keep
+
+        # --- Cierre de posiciones SHORT ---
+        # Se conserva la fórmula de backtest(), que usa n_shares de los parámetros en el segundo término.
+        if shorts:
+            keep = []
+            for position in shorts:
+                if position[2] < price or position[3] > price:
+                    cash_in = ((position[0] * position[1]) + (position[0] * n_shares - price * position[1])) * (1 - COM)
+                    cash += cash_in
+                    if ledger is not None:
+                        ledger.close(position[4], bar, price, EXIT_SL if position[2] < price else EXIT_TP,
+                                     cash_in - position[0] * position[1] * (1 + COM))
+                else:
+                    keep.append(position)
+            shorts = keep
+
+        # --- Apertura de nuevas posiciones ---
+        if buy:
+            cost = price * n_shares * (1 + COM)
+            if cash > cost:
+                cash -= cost
+                trade_id = -1 if ledger is None else ledger.open(bar, price, LONG, n_shares)
+                longs.append((price, n_shares, price * (1 - SL), price * (1 + TP), trade_id))
+
+        if sell:
+            cost = price * n_shares * (1 + COM)
+            if cash > cost:
+                cash -= cost
+                trade_id = -1 if ledger is None else ledger.open(bar, price, SHORT, n_shares)
+                shorts.append((price, n_shares, price * (1 + SL), price * (1 - TP), trade_id))
+
+        # --- Valor del portafolio (mismo orden de suma que get_portfolio_value) ---
+        val = cash
+        for position in longs:
+            val += price * position[1]
+        for position in shorts:
+            val += (position[0] * position[1]) + (position[0] * position[1] - price * position[1]) * (1 - COM)
+        values.append(val)
+
+    state.cash = cash
+    state.long_positions = longs
+    state.short_positions = shorts
+    state.bar += len(close)
+    return values, state
+
+
+def close_open_positions(state: EngineState, price: float, params: dict):
+    """
+    Registra en el ledger las posiciones que siguen abiertas como cerradas por fin de datos (END),
+    igual que backtest(): al último precio, con exit_bar igual al número de velas y sin afectar el efectivo.
+    """
+    ledger = state.ledger
+    if ledger is None:
+        return
+    n_shares = params['n_shares']
+    for position in state.long_positions:
+        ledger.close(position[4], state.bar, price, EXIT_END,
+                     price * position[1] * (1 - COM) - position[0] * position[1] * (1 + COM))
+    for position in state.short_positions:
+        ledger.close(position[4], state.bar, price, EXIT_END,
+                     ((position[0] * position[1]) + (position[0] * n_shares - price * position[1])) * (1 - COM)
+                     - position[0] * position[1] * (1 + COM))
+
+
+def performance(values, periods: float = 8760) -> dict:
+    """
+    Calcula las métricas de backtest() a partir de la curva del portafolio.
+
+    Args:
+        values: valores del portafolio, incluyendo el capital inicial como primer elemento.
+        periods: barras por año para anualizar (8760 para velas de 1h).
+
+    Returns:
+        dict: 'Portfolio', 'Sharpe', 'Calmar', 'Sortino' y 'Win Rate'.
+    """
+    values_port = pd.Series(values, dtype=float)
+    rets = values_port.pct_change()
+    mean_t = rets.mean()
+    std_t = rets.std()
+    return {
+        'Portfolio': values_port.iloc[-1],
+        'Sharpe': annualized_sharpe(mean=mean_t, std=std_t, periods=periods),
+        'Calmar': annualized_calmar(mean=mean_t, values=values_port, periods=periods),
+        'Sortino': annualized_sortino(mean_t, rets, periods=periods),
+        'Win Rate': win_rate(rets),
+    }
+
+
+def fast_backtest(data: pd.DataFrame, params: dict, store: IndicatorStore = None, periods: float = 8760,
+                  ledger: TradeLedger = None):
+    """
+    Versión rápida de backtest(trial=None, data=data, params=params).
+    Si se pasa un IndicatorStore, los indicadores se reutilizan en lugar de recalcularse.
+    periods permite anualizar correctamente datos de otra temporalidad (ver resample.bars_per_year).
+    Si se pasa un TradeLedger, las operaciones se registran en él (igual que en backtest()).
+
+    Returns:
+        tuple: (calmar, values_port, results) con el mismo formato que backtest().
+    """
+    if store is None:
+        store = IndicatorStore(data)
+    buy_signal, sell_signal = combined_signals(store, params)
+    if ledger is None:
+        ledger = TradeLedger()
+    values, state = simulate(store.prices, buy_signal, sell_signal, params, EngineState(ledger=ledger))
+    if len(store):
+        close_open_positions(state, store.prices[-1], params)
+
+    values_port = pd.Series([INITIAL_CASH] + values, dtype=float, name='value')
+    stats = performance(values_port, periods=periods)
+    results = pd.DataFrame()
+    results['Portfolio'] = values_port.tail(1)
+    for name in ('Sharpe', 'Calmar', 'Sortino', 'Win Rate'):
+        results[name] = stats[name]
+    for name, value in trade_statistics(state.ledger.trades, state.bar).items():
+        results[name] = value
+    return stats['Calmar'], values_port, results
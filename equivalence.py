@@ -0,0 +1,401 @@
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest
+from engine import fast_backtest, performance
+from indicators import IndicatorStore, combined_signals
+from metrics import annualized_sortino
+from models import TradeLedger, SHORT, EXIT_SL, EXIT_TP
+from out_of_core import OHLCV_COLUMNS, OHLCV_DTYPE, chunked_backtest
+from signals import rsi_signals, macd_signals, bbands_signals, obv_signals, atr_breakout_signals, adx_signals
+from walk_forward_objective import PARAM_SPACE
+
+# --- Propósito general del archivo ---
+# Este archivo implementa pruebas diferenciales entre la implementación de referencia
+# (signals.py + backtest() + metrics.py) y cualquier motor alternativo más rápido.
+# Genera series OHLCV sintéticas y parámetros aleatorios del espacio de búsqueda de Optuna,
+# corre la referencia y cada candidato sobre los mismos datos y reporta, con tolerancias configurables:
+#   - las velas donde cambian las señales finales de compra o venta;
+#   - las velas donde diverge el valor del portafolio;
+#   - las métricas que difieren;
+#   - el tiempo de cada implementación, para que toda mejora de velocidad venga con su verificación.
+# La referencia es backtest() tal cual, por lo que sus particularidades (el cierre de SHORT con el
+# n_shares externo, annualized_sortino = 0 con retornos negativos, etc.) quedan fijadas: un motor
+# que las "corrija" aparece como divergente.
+#
+# Un motor es una función engine(data, params) que devuelve un diccionario con:
+#   'buy', 'sell': señales finales por vela (o None si el motor no las expone),
+#   'values': curva del portafolio con el capital inicial como primer elemento,
+#   'metrics': diccionario de métricas (mismos nombres que las columnas de resultados de backtest()),
+#   'trades': arreglo TradeLedger.trades con las operaciones (o None si el motor no las registra).
+
+
+@dataclass
+class Tolerances:
+    # Tolerancias de comparación (np.isclose); con ceros la comparación es exacta.
+    equity_rtol: float = 0.0
+    equity_atol: float = 0.0
+    metric_rtol: float = 0.0
+    metric_atol: float = 0.0
+    # Velas con señal distinta que se aceptan.
+    max_signal_flips: int = 0
+    # Si True, las diferencias se reportan pero el motor no se califica (passed queda en NaN).
+    informational: bool = False
+
+
+def synthetic_ohlcv(n: int, seed: int = 0, drift: float = 0.0, volatility: float = 0.01) -> pd.DataFrame:
+    """
+    Genera una serie OHLCV sintética de velas de 1h con un paseo aleatorio geométrico.
+
+    Args:
+        n: número de velas.
+        seed: semilla del generador.
+        drift: retorno medio por vela (negativo para probar tendencias bajistas).
+        volatility: desviación estándar de los retornos por vela.
+
+    Returns:
+        pd.DataFrame: columnas 'timestamp', 'Open', 'High', 'Low', 'Close', 'Volume BTC' y 'Volume USDT'.
+    """
+    rng = np.random.default_rng(seed)
+    close = 30_000 * np.exp(np.cumsum(rng.normal(drift, volatility, n)))
+    open_ = np.concatenate([close[:1], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 3, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 3, n)))
+    volume = rng.lognormal(3, 1, n)
+    return pd.DataFrame({
+        'timestamp': 1_500_000_000_000 + np.arange(n, dtype=np.int64) * 3_600_000,
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume BTC': volume,
+        'Volume USDT': volume * close,
+    })
+
+
+def random_params(rng: np.random.Generator) -> dict:
+    # Parámetros aleatorios uniformes dentro de PARAM_SPACE (el mismo espacio que explora Optuna).
+    params = {}
+    for name, (kind, low, high) in PARAM_SPACE.items():
+        params[name] = int(rng.integers(low, high + 1)) if kind == 'int' else float(rng.uniform(low, high))
+    return params
+
+
+# --- Motores ---
+
+def reference_engine(data: pd.DataFrame, params: dict) -> dict:
+    # Referencia: señales de signals.py combinadas como en backtest() y curva y métricas de backtest().
+    buy_rsi, sell_rsi = rsi_signals(data, rsi_window=params['rsi_window'], rsi_lower=params['rsi_lower'],
+                                    rsi_upper=params['rsi_upper'])
+    buy_macd, _ = macd_signals(data, fast=params['macd_fast'], slow=params['macd_slow'], signal=params['macd_signal'])
+    buy_bbands, sell_bbands = bbands_signals(data, params['bb_window'], params['bb_std'])
+    buy_obv, _ = obv_signals(data, window=params['obv_window'])
+    buy_atr, _ = atr_breakout_signals(data, atr_window=params['atr_window'], atr_mult=params['atr_mult'])
+    buy_adx, _ = adx_signals(data, window=params['adx_window'], threshold=params['adx_tresh'])
+
+    # Misma combinación que backtest(): al menos 2 de 6 para comprar y 2 de 2 (RSI, Bollinger) para vender
+    buy_signal = pd.concat([buy_rsi, buy_macd, buy_bbands, buy_obv, buy_atr, buy_adx], axis=1).sum(axis=1) >= 2
+    sell_signal = pd.concat([sell_rsi, sell_bbands], axis=1).sum(axis=1) >= 2
+
+    ledger = TradeLedger()
+    _, values_port, results = backtest(data, None, params, ledger=ledger)
+    return {
+        'buy': buy_signal.to_numpy(),
+        'sell': sell_signal.to_numpy(),
+        'values': values_port.to_numpy(),
+        'metrics': results.iloc[0].to_dict(),
+        'trades': ledger.trades,
+    }
+
+
+def fast_engine(data: pd.DataFrame, params: dict, dtype=np.float64) -> dict:
+    # engine.fast_backtest con el cache de indicadores (dtype=np.float32 para el modo de precisión reducida).
+    store = IndicatorStore(data, dtype=dtype)
+    buy_signal, sell_signal = combined_signals(store, params)
+    ledger = TradeLedger()
+    _, values_port, results = fast_backtest(data, params, store=store, ledger=ledger)
+    return {
+        'buy': buy_signal,
+        'sell': sell_signal,
+        'values': values_port.to_numpy(),
+        'metrics': results.iloc[0].to_dict(),
+        'trades': ledger.trades,
+    }
+
+
+def float32_engine(data: pd.DataFrame, params: dict) -> dict:
+    return fast_engine(data, params, dtype=np.float32)
+
+
+def chunked_engine(data: pd.DataFrame, params: dict, chunksize: int = 1_000, warmup: int = 2_000) -> dict:
+    # out_of_core.chunked_backtest sobre un .npy temporal; no expone señales por vela.
+    # Con series mucho más largas que chunksize + warmup (ver differential_test), los bloques a partir
+    # del tercero sólo ven `warmup` velas de historia: se prueba el truncamiento en las fronteras
+    # entre bloques, que es la única fuente posible de divergencia.
+    block = np.empty(len(data), dtype=OHLCV_DTYPE)
+    for col in OHLCV_COLUMNS:
+        block[col] = data[col].to_numpy()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.npy')
+        np.save(path, block)
+        ledger = TradeLedger()
+        metrics, values_port = chunked_backtest(path, params, chunksize=chunksize, warmup=warmup,
+                                                keep_curve=True, ledger=ledger)
+    return {'buy': None, 'sell': None, 'values': values_port.to_numpy(), 'metrics': metrics,
+            'trades': ledger.trades}
+
+
+# Motores alternativos disponibles y sus tolerancias por defecto.
+# fast_backtest reproduce la referencia bit a bit; la versión por bloques acumula las métricas
+# en otro orden (sólo diferencias de redondeo en las métricas; curva y operaciones exactas).
+# float32 cambia de forma legítima las señales en empates cercanos a los umbrales, así que no
+# existe una tolerancia estricta que lo califique: se reporta sólo como información.
+CANDIDATES = {
+    'fast_backtest': (fast_engine, Tolerances()),
+    'chunked_backtest': (chunked_engine, Tolerances(metric_rtol=1e-9, metric_atol=1e-12)),
+    'float32': (float32_engine, Tolerances(informational=True)),
+}
+
+
+# --- Comparación ---
+
+def _timed(engine, data, params):
+    start = time.perf_counter()
+    output = engine(data, params)
+    return output, time.perf_counter() - start
+
+
+def divergences(reference: dict, candidate: dict, tol: Tolerances = Tolerances()) -> pd.DataFrame:
+    """
+    Lista, vela por vela, dónde el candidato difiere de la referencia en señales o valor del portafolio.
+
+    Args:
+        reference, candidate: salidas de dos motores sobre los mismos datos y parámetros.
+        tol: tolerancias para el valor del portafolio.
+
+    Returns:
+        pd.DataFrame: una fila por vela divergente con las señales y valores de ambos motores.
+        La vela i corresponde a values[i + 1] (values[0] es el capital inicial).
+    """
+    ref_values = np.asarray(reference['values'], dtype=float)[1:]
+    cand_values = np.asarray(candidate['values'], dtype=float)[1:]
+    n = min(len(ref_values), len(cand_values))
+
+    mask = ~np.isclose(cand_values[:n], ref_values[:n], rtol=tol.equity_rtol, atol=tol.equity_atol)
+    detail = {'value_ref': ref_values[:n], 'value_cand': cand_values[:n]}
+    for side in ('buy', 'sell'):
+        if candidate[side] is not None:
+            ref_signal = np.asarray(reference[side], dtype=bool)[:n]
+            cand_signal = np.asarray(candidate[side], dtype=bool)[:n]
+            mask |= ref_signal != cand_signal
+            detail[f'{side}_ref'] = ref_signal
+            detail[f'{side}_cand'] = cand_signal
+
+    frame = pd.DataFrame(detail)
+    frame['value_diff'] = frame['value_cand'] - frame['value_ref']
+    frame.index.name = 'bar'
+    return frame[mask]
+
+
+def _closed_trades(trades, side: int = None):
+    # Operaciones cerradas por SL o TP (las cerradas por fin de datos dependen de cada motor).
+    mask = np.isin(trades['exit_reason'], [EXIT_SL, EXIT_TP])
+    if side is not None:
+        mask &= trades['side'] == side
+    return trades[mask]
+
+
+def trade_mismatches(ref_trades, cand_trades, tol: Tolerances = Tolerances(), side: int = None) -> int:
+    """
+    Cuenta las operaciones cerradas por SL o TP que difieren entre la referencia y un candidato:
+    velas y motivo de entrada/salida exactos; precios y flujo de efectivo (pnl) con las tolerancias
+    del portafolio. Las operaciones que sólo existen en uno de los dos motores también cuentan.
+    """
+    ref, cand = _closed_trades(ref_trades, side), _closed_trades(cand_trades, side)
+    n = min(len(ref), len(cand))
+    extra = abs(len(ref) - len(cand))
+    ref, cand = ref[:n], cand[:n]
+    bad = np.zeros(n, dtype=bool)
+    for field in ('entry_bar', 'exit_bar', 'side', 'exit_reason'):
+        bad |= ref[field] != cand[field]
+    for field in ('entry_price', 'exit_price', 'n_shares', 'pnl'):
+        bad |= ~np.isclose(cand[field], ref[field], rtol=tol.equity_rtol, atol=tol.equity_atol)
+    return int(bad.sum()) + extra
+
+
+def compare(reference: dict, candidate: dict, tol: Tolerances = Tolerances()) -> dict:
+    """
+    Resume las diferencias entre la referencia y un candidato.
+
+    Returns:
+        dict: velas con señal distinta, primera vela divergente, diferencia máxima del portafolio,
+        operaciones distintas, métricas fuera de tolerancia y si la comparación pasa
+        (NaN para motores informativos).
+    """
+    row = {}
+    flips = 0
+    first_bars = []
+    for side in ('buy', 'sell'):
+        if candidate[side] is None:
+            row[f'{side}_flips'] = np.nan
+            continue
+        diff = np.flatnonzero(np.asarray(reference[side], dtype=bool) != np.asarray(candidate[side], dtype=bool))
+        row[f'{side}_flips'] = len(diff)
+        flips += len(diff)
+        if len(diff):
+            first_bars.append(int(diff[0]))
+
+    ref_values = np.asarray(reference['values'], dtype=float)
+    cand_values = np.asarray(candidate['values'], dtype=float)
+    same_length = len(ref_values) == len(cand_values)
+    if same_length:
+        bad = np.flatnonzero(~np.isclose(cand_values, ref_values, rtol=tol.equity_rtol, atol=tol.equity_atol))
+        row['equity_divergences'] = len(bad)
+        row['max_equity_diff'] = float(np.max(np.abs(cand_values - ref_values))) if len(ref_values) else 0.0
+        if len(bad):
+            # Se resta 1 porque values[0] es el capital inicial
+            first_bars.append(max(int(bad[0]) - 1, 0))
+    else:
+        row['equity_divergences'] = abs(len(ref_values) - len(cand_values))
+        row['max_equity_diff'] = np.nan
+    row['first_divergent_bar'] = min(first_bars) if first_bars else -1
+
+    # --- Métricas ---
+    # Sólo se comparan las métricas que reportan ambos motores; NaN == NaN se considera igual.
+    failed_metrics = []
+    for name, ref_value in reference['metrics'].items():
+        if name not in candidate['metrics']:
+            continue
+        if not np.isclose(candidate['metrics'][name], ref_value, rtol=tol.metric_rtol, atol=tol.metric_atol,
+                          equal_nan=True):
+            failed_metrics.append(name)
+    row['metric_mismatches'] = ','.join(failed_metrics)
+
+    # --- Operaciones cerradas por SL o TP ---
+    if candidate.get('trades') is None:
+        row['trade_mismatches'] = np.nan
+        trades_ok = True
+    else:
+        row['trade_mismatches'] = trade_mismatches(reference['trades'], candidate['trades'], tol)
+        trades_ok = row['trade_mismatches'] == 0
+
+    if tol.informational:
+        row['passed'] = np.nan
+    else:
+        row['passed'] = (same_length and flips <= tol.max_signal_flips and row['equity_divergences'] == 0
+                         and trades_ok and not failed_metrics)
+    return row
+
+
+def differential_test(candidates: dict = None, n_cases: int = 20, n_bars: int = 10_000, seed: int = 0,
+                      reference=reference_engine) -> pd.DataFrame:
+    """
+    Corre la referencia y cada motor candidato sobre casos aleatorios (datos sintéticos y parámetros).
+
+    Args:
+        candidates: diccionario {nombre: (engine, Tolerances)}; por defecto CANDIDATES.
+        n_cases: número de casos aleatorios.
+        n_bars: velas por serie sintética.
+        seed: semilla general; cada caso usa su propia semilla derivada de ésta.
+        reference: motor de referencia.
+
+    Returns:
+        pd.DataFrame: una fila por (caso, motor) con el resumen de compare(), los tiempos de
+        ambas implementaciones y la aceleración del candidato.
+    """
+    candidates = CANDIDATES if candidates is None else candidates
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for case in range(n_cases):
+        # Se alternan tendencias alcistas y bajistas para cubrir también Sortino = 0 y pérdidas
+        case_seed = int(rng.integers(2 ** 31))
+        drift = float(rng.uniform(-1e-3, 1e-3))
+        data = synthetic_ohlcv(n_bars, seed=case_seed, drift=drift)
+        params = random_params(rng)
+
+        ref_output, ref_seconds = _timed(reference, data, params)
+        for name, (engine, tol) in candidates.items():
+            cand_output, cand_seconds = _timed(engine, data, params)
+            rows.append({
+                'case': case,
+                'seed': case_seed,
+                'drift': drift,
+                'engine': name,
+                **compare(ref_output, cand_output, tol),
+                'ref_sec': ref_seconds,
+                'cand_sec': cand_seconds,
+                'speedup': ref_seconds / cand_seconds if cand_seconds > 0 else np.nan,
+            })
+    return pd.DataFrame(rows)
+
+
+def check_quirks(candidates: dict = None, n_cases: int = 5, n_bars: int = 10_000, seed: int = 1) -> dict:
+    """
+    Verifica que cada motor candidato conserve las particularidades de la referencia.
+
+    Args:
+        candidates: diccionario {nombre: (engine, Tolerances)}; por defecto CANDIDATES
+            (los motores informativos no se califican).
+        n_cases: series bajistas sintéticas sobre las que se comparan los cierres de SHORT.
+        n_bars: velas por serie.
+        seed: semilla de los casos.
+
+    Returns:
+        dict: {particularidad: True si se conserva}.
+    """
+    candidates = CANDIDATES if candidates is None else candidates
+    checks = {}
+    # annualized_sortino devuelve 0 cuando el retorno anualizado no es positivo
+    rets = pd.Series([-0.01, 0.005, -0.02])
+    checks['sortino_zero_on_losses'] = annualized_sortino(rets.mean(), rets) == 0
+    checks['engine_sortino_zero_on_losses'] = performance([1_000_000, 990_000, 995_000, 975_000])['Sortino'] == 0
+
+    # --- Cierre de posiciones SHORT ---
+    # backtest() calcula el efectivo del cierre con el n_shares externo (el de los parámetros):
+    # (entrada * n_pos + (entrada * n_shares - salida * n_pos)) * (1 - COM). Como todas las posiciones
+    # tienen el mismo tamaño, lo observable es el flujo de efectivo de cada cierre: cada candidato
+    # debe cerrar los mismos SHORT, en las mismas velas y con el mismo pnl que la referencia.
+    rng = np.random.default_rng(seed)
+    cases = []
+    for _ in range(n_cases):
+        data = synthetic_ohlcv(n_bars, seed=int(rng.integers(2 ** 31)), drift=float(rng.uniform(-1e-3, 0)))
+        params = random_params(rng)
+        cases.append((data, params, reference_engine(data, params)))
+    n_shorts = sum(len(_closed_trades(ref['trades'], SHORT)) for _, _, ref in cases)
+    checks['reference_has_short_closes'] = n_shorts > 0
+
+    for name, (engine, tol) in candidates.items():
+        if tol.informational:
+            continue
+        mismatches = 0
+        for data, params, ref in cases:
+            trades = engine(data, params)['trades']
+            mismatches += trade_mismatches(ref['trades'], trades, tol, side=SHORT)
+        checks[f'short_close_{name}'] = n_shorts > 0 and mismatches == 0
+    return checks
+
+
+# --- Ejecución del script ---
+# Prueba diferencial de todos los motores alternativos contra la referencia.
+if __name__ == "__main__":
+    print(check_quirks())
+    report = differential_test(n_cases=10, n_bars=10_000)
+    # min_count=1 deja NaN en los motores que no exponen señales
+    total = lambda s: s.sum(min_count=1)
+    summary = report.groupby('engine').agg(passed=('passed', 'mean'), buy_flips=('buy_flips', total),
+                                           sell_flips=('sell_flips', total),
+                                           max_equity_diff=('max_equity_diff', 'max'),
+                                           trade_mismatches=('trade_mismatches', total),
+                                           ref_sec=('ref_sec', 'sum'), cand_sec=('cand_sec', 'sum'))
+    summary['speedup'] = summary['ref_sec'] / summary['cand_sec']
+    print(summary.to_string())
+    failures = report[report['passed'] == False]
+    if not failures.empty:
+        print("Casos fuera de tolerancia:")
+        print(failures.to_string(index=False))
@@ -0,0 +1,415 @@
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+import ta.momentum, ta.trend, ta.volatility
+
+# --- Propósito general del archivo ---
+# Este archivo contiene un almacén (cache) de indicadores técnicos calculados una sola vez
+# sobre un DataFrame de precios. Los indicadores dependen únicamente de sus ventanas, mientras
+# que las señales dependen además de umbrales; por eso, al evaluar muchos conjuntos de
+# parámetros sobre los mismos datos, el costo de los indicadores se paga una sola vez por ventana.
+# Las señales generadas son idénticas a las de signals.py y a la combinación usada en backtest().
+# Opcionalmente el store guarda precios e indicadores en float32 (dtype=np.float32), lo que reduce
+# a la mitad la memoria del cache; la contabilidad del portafolio siempre usa los precios en float64.
+# StreamingSignals calcula las mismas señales vela por vela, con estado incremental, para paper trading.
+
+
+class IndicatorStore:
+    '''
+    Cache de indicadores técnicos sobre un DataFrame de precios.
+    Cada indicador se calcula con la librería `ta` (igual que en signals.py) la primera vez que
+    se solicita y se guarda como arreglo de NumPy para reutilizarlo en evaluaciones posteriores.
+    '''
+
+    def __init__(self, data: pd.DataFrame, maxsize: int = 256, dtype=np.float64):
+        # --- Parámetros ---
+        # data: DataFrame con columnas 'Close', 'High', 'Low' y 'Volume BTC'.
+        # maxsize: número máximo de indicadores guardados; al superarlo se descarta el más antiguo.
+        # dtype: precisión de los precios de entrada y de los indicadores guardados (float64 o float32).
+        self.dtype = np.dtype(dtype)
+        self.close = data['Close'].astype(self.dtype)
+        self.high = data['High'].astype(self.dtype)
+        self.low = data['Low'].astype(self.dtype)
+        self.volume = data['Volume BTC'].astype(self.dtype)
+        # close_values alimenta las señales; prices se usa para la contabilidad y siempre es float64.
+        self.close_values = self.close.to_numpy()
+        self.prices = data['Close'].to_numpy(dtype=np.float64)
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._obv = None
+
+    def __len__(self):
+        return len(self.close_values)
+
+    @property
+    def nbytes(self) -> int:
+        # Memoria ocupada por los indicadores guardados.
+        return sum(array.nbytes for value in list(self._cache.values()) for array in
+                   (value if isinstance(value, tuple) else (value,)))
+
+    def _get(self, key, compute):
+        # Devuelve el indicador guardado o lo calcula y lo guarda (política FIFO).
+        # Se usa get() para que el cache pueda compartirse entre hilos (n_jobs de Optuna).
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if isinstance(value, tuple):
+            value = tuple(array.astype(self.dtype, copy=False) for array in value)
+        else:
+            value = value.astype(self.dtype, copy=False)
+        self._cache[key] = value
+        while len(self._cache) > self.maxsize:
+            try:
+                self._cache.popitem(last=False)
+            except KeyError:
+                break
+        return value
+
+    def rsi(self, window: int) -> np.ndarray:
+        return self._get(('rsi', window), lambda: ta.momentum.RSIIndicator(
+            self.close, window=window).rsi().to_numpy())
+
+    def macd(self, fast: int, slow: int, signal: int):
+        # Garantiza relación válida (igual que macd_signals)
+        if slow <= fast:
+            slow = fast + 1
+
+        def compute():
+            macd_ind = ta.trend.MACD(close=self.close, window_fast=fast, window_slow=slow, window_sign=signal)
+            return macd_ind.macd().to_numpy(), macd_ind.macd_signal().to_numpy()
+
+        return self._get(('macd', fast, slow, signal), compute)
+
+    def bbands(self, window: int, n_std: int):
+        def compute():
+            bb = ta.volatility.BollingerBands(self.close, window=window, window_dev=n_std)
+            return bb.bollinger_lband().to_numpy(), bb.bollinger_hband().to_numpy()
+
+        return self._get(('bbands', window, n_std), compute)
+
+    def obv(self, window: int):
+        # El OBV acumulado no depende de la ventana: se calcula una sola vez.
+        if self._obv is None:
+            close = self.close
+            self._obv = ((close > close.shift(1)) * self.volume
+                         - (close < close.shift(1)) * self.volume).cumsum()
+        obv = self._obv
+        return self._get(('obv', window), lambda: (
+            obv.to_numpy(), obv.rolling(window=window).mean().to_numpy()))
+
+    def _nan(self, n_arrays: int):
+        # Indicador sin datos suficientes: todas sus señales quedan en False.
+        return tuple(np.full(len(self), np.nan, dtype=self.dtype) for _ in range(n_arrays))
+
+    def atr(self, window: int):
+        def compute():
+            # `ta` falla si hay menos velas que la ventana del ATR
+            if len(self) < window:
+                return self._nan(3)
+            atr = ta.volatility.AverageTrueRange(
+                high=self.high, low=self.low, close=self.close, window=window
+            ).average_true_range()
+            rolling_high = self.high.rolling(window=window).max()
+            rolling_low = self.low.rolling(window=window).min()
+            return atr.to_numpy(), rolling_high.to_numpy(), rolling_low.to_numpy()
+
+        return self._get(('atr', window), compute)
+
+    def adx(self, window: int):
+        def compute():
+            # `ta` necesita al menos 2 * window velas para el ADX
+            if len(self) < 2 * window:
+                return self._nan(3)
+            adx_ind = ta.trend.ADXIndicator(high=self.high, low=self.low, close=self.close, window=window)
+            return adx_ind.adx().to_numpy(), adx_ind.adx_pos().to_numpy(), adx_ind.adx_neg().to_numpy()
+
+        return self._get(('adx', window), compute)
+
+
+def _shift(values: np.ndarray) -> np.ndarray:
+    # Equivalente a Series.shift(1): el primer elemento queda como NaN.
+    shifted = np.empty_like(values)
+    shifted[0:1] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def _cross(fast: np.ndarray, slow: np.ndarray):
+    # Cruces alcista y bajista de `fast` sobre `slow` (mismas reglas que signals.py).
+    prev_fast, prev_slow = _shift(fast), _shift(slow)
+    up = (prev_fast <= prev_slow) & (fast > slow)
+    down = (prev_fast >= prev_slow) & (fast < slow)
+    return up, down
+
+
+def signal_components(store: IndicatorStore, params: dict) -> dict:
+    """
+    Calcula cada señal individual a partir del cache de indicadores (mismas reglas que signals.py).
+
+    Returns:
+        dict: {'buy_rsi': ..., 'sell_rsi': ..., 'buy_macd': ..., ...} con arreglos booleanos de NumPy.
+    """
+    close = store.close_values
+    components = {}
+
+    rsi = store.rsi(params['rsi_window'])
+    components['buy_rsi'] = rsi < params['rsi_lower']
+    components['sell_rsi'] = rsi > params['rsi_upper']
+
+    macd, macd_sig = store.macd(params['macd_fast'], params['macd_slow'], params['macd_signal'])
+    components['buy_macd'], components['sell_macd'] = _cross(macd, macd_sig)
+
+    lower, upper = store.bbands(params['bb_window'], params['bb_std'])
+    components['buy_bbands'] = close < lower
+    components['sell_bbands'] = close > upper
+
+    obv, obv_ma = store.obv(params['obv_window'])
+    components['buy_obv'], components['sell_obv'] = _cross(obv, obv_ma)
+
+    atr, rolling_high, rolling_low = store.atr(params['atr_window'])
+    components['buy_atr'] = close > (rolling_high - atr * params['atr_mult'])
+    components['sell_atr'] = close < (rolling_low + atr * params['atr_mult'])
+
+    adx, plus_di, minus_di = store.adx(params['adx_window'])
+    buy_adx, sell_adx = _cross(plus_di, minus_di)
+    components['buy_adx'] = buy_adx & (adx >= params['adx_tresh'])
+    components['sell_adx'] = sell_adx & (adx >= params['adx_tresh'])
+    return components
+
+
+def combined_signals(store: IndicatorStore, params: dict):
+    """
+    Calcula las señales finales de compra y venta a partir del cache de indicadores.
+    Reproduce la combinación de backtest(): compra con al menos 2 de 6 señales
+    (RSI, MACD, Bollinger, OBV, ATR, ADX) y venta con al menos 2 de 2 (RSI, Bollinger).
+
+    Args:
+        store: IndicatorStore construido sobre los datos a evaluar.
+        params: diccionario con los parámetros de la estrategia.
+
+    Returns:
+        tuple: (buy_signal, sell_signal) como arreglos booleanos de NumPy.
+    """
+    c = signal_components(store, params)
+
+    # --- Combinación de señales ---
+    # Condición: al menos 2 señales activas para confirmar compra o venta
+    buy_count = (c['buy_rsi'].astype(np.int8) + c['buy_macd'] + c['buy_bbands']
+                 + c['buy_obv'] + c['buy_atr'] + c['buy_adx'])
+    sell_count = c['sell_rsi'].astype(np.int8) + c['sell_bbands']
+    return buy_count >= 2, sell_count >= 2
+
+
+
+# --- Señales incrementales ---
+# Pasos de las medias exponenciales de pandas con adjust=False (mismo orden de operaciones que ewm).
+def _ewm_step(prev: float, value: float, alpha: float) -> float:
+    old_wt = 1.0 - alpha
+    return (old_wt * prev + alpha * value) / (old_wt + alpha)
+
+
+class _EWM:
+    # Media exponencial de Series.ewm(alpha=..., min_periods=..., adjust=False).mean(), una vela a la vez.
+    # Los valores NaN iniciales se ignoran: la media empieza en la primera observación válida.
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = np.nan
+        self.nobs = 0
+
+    def update(self, x: float) -> float:
+        if x == x:
+            self.value = x if self.nobs == 0 else _ewm_step(self.value, x, self.alpha)
+            self.nobs += 1
+        return self.value if self.nobs >= self.min_periods else np.nan
+
+
+class _Wilder:
+    # Suavizado de `ta` para ATR y ADX: promedio de las primeras `window` observaciones
+    # y después (anterior * (window - 1) + x) / window. Devuelve 0 mientras no hay suficientes datos.
+    def __init__(self, window: int):
+        self.window = window
+        self.first = []
+        self.value = 0.0
+
+    def update(self, x: float) -> float:
+        if len(self.first) < self.window:
+            self.first.append(x)
+            if len(self.first) == self.window:
+                self.value = float(np.mean(self.first))
+            return self.value
+        self.value = (self.value * (self.window - 1) + x) / float(self.window)
+        return self.value
+
+
+class _Rolling:
+    # Ventana móvil con rolling(window).mean()/std(ddof=0)/max()/min(); NaN hasta tener `window` datos.
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, x: float):
+        self.values.append(x)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def mean(self) -> float:
+        return sum(self.values) / self.window if self.full else np.nan
+
+    def std(self) -> float:
+        if not self.full:
+            return np.nan
+        mean = sum(self.values) / self.window
+        return (sum((x - mean) ** 2 for x in self.values) / self.window) ** 0.5
+
+    def max(self) -> float:
+        return max(self.values) if self.full else np.nan
+
+    def min(self) -> float:
+        return min(self.values) if self.full else np.nan
+
+
+def _crossed(prev: tuple, fast: float, slow: float):
+    # Cruce alcista y bajista entre la vela anterior y la actual (las comparaciones con NaN son False).
+    prev_fast, prev_slow = prev
+    return (prev_fast <= prev_slow and fast > slow), (prev_fast >= prev_slow and fast < slow)
+
+
+class StreamingSignals:
+    '''
+    Señales finales de compra y venta calculadas vela por vela con estado incremental.
+    Reproduce las fórmulas de `ta` que usa IndicatorStore (RSI, MACD, Bollinger, OBV, ATR y ADX)
+    sobre toda la historia recibida, sin recalcular los indicadores desde cero en cada vela:
+    el costo por vela es O(ventana más grande). Las sumas de las ventanas móviles se hacen en otro
+    orden que en pandas, así que los indicadores pueden diferir en el último bit.
+    '''
+
+    def __init__(self, params: dict):
+        self.params = params
+        slow = params['macd_slow'] if params['macd_slow'] > params['macd_fast'] else params['macd_fast'] + 1
+        self.bar = 0
+        self.prev_close = np.nan
+        self.prev_high = np.nan
+        self.prev_low = np.nan
+
+        # RSI
+        self.rsi_up = _EWM(1 / params['rsi_window'], params['rsi_window'])
+        self.rsi_down = _EWM(1 / params['rsi_window'], params['rsi_window'])
+        # MACD (las medias se actualizan desde la primera vela; min_periods sólo oculta el inicio)
+        self.ema_fast = _EWM(2 / (params['macd_fast'] + 1), params['macd_fast'])
+        self.ema_slow = _EWM(2 / (slow + 1), slow)
+        self.macd_sig = _EWM(2 / (params['macd_signal'] + 1), params['macd_signal'])
+        self.prev_macd = (np.nan, np.nan)
+        # Bollinger
+        self.bb = _Rolling(params['bb_window'])
+        # OBV
+        self.obv = 0.0
+        self.obv_ma = _Rolling(params['obv_window'])
+        self.prev_obv = (np.nan, np.nan)
+        # ATR y máximos/mínimos móviles
+        self.atr = _Wilder(params['atr_window'])
+        self.rolling_high = _Rolling(params['atr_window'])
+        self.rolling_low = _Rolling(params['atr_window'])
+        # ADX: sumas suavizadas de rango, movimiento positivo y negativo, y promedio del DX
+        self.adx_trs = 0.0
+        self.adx_pos = 0.0
+        self.adx_neg = 0.0
+        self.adx_dx = _Wilder(params['adx_window'])
+        self.prev_di = (np.nan, np.nan)
+
+    def _adx(self, high: float, low: float):
+        # ADXIndicator de `ta`: la primera suma cubre las velas 1..window (la vela 0 no tiene cierre
+        # previo); después se suaviza con s - s / window + x. +DI y -DI valen 0 hasta la vela window
+        # y el ADX vale 0 hasta la vela 2 * window - 1.
+        window = self.params['adx_window']
+        bar = self.bar
+        if bar == 0:
+            return 0.0, 0.0, 0.0
+        close = self.prev_close
+        dm = max(high, close) - min(low, close)
+        diff_up = high - self.prev_high
+        diff_down = self.prev_low - low
+        pos = diff_up if (diff_up > diff_down and diff_up > 0) else 0.0
+        neg = diff_down if (diff_down > diff_up and diff_down > 0) else 0.0
+        if bar <= window:
+            self.adx_trs += dm
+            self.adx_pos += pos
+            self.adx_neg += neg
+        else:
+            self.adx_trs = self.adx_trs - self.adx_trs / float(window) + dm
+            self.adx_pos = self.adx_pos - self.adx_pos / float(window) + pos
+            self.adx_neg = self.adx_neg - self.adx_neg / float(window) + neg
+        if bar < window:
+            return 0.0, 0.0, 0.0
+
+        plus = 100 * (self.adx_pos / self.adx_trs) if self.adx_trs != 0 else 0
+        minus = 100 * (self.adx_neg / self.adx_trs) if self.adx_trs != 0 else 0
+        dx = 100 * np.abs((plus - minus) / (plus + minus)) if plus + minus != 0 else 0
+        adx = self.adx_dx.update(dx)
+        if bar == window:
+            plus = minus = 0.0
+        return adx, plus, minus
+
+    def update(self, bar: dict):
+        """
+        Procesa una vela nueva.
+
+        Args:
+            bar: diccionario con 'Close', 'High', 'Low' y 'Volume BTC'.
+
+        Returns:
+            tuple: (buy, sell) de la vela recibida, con la combinación de combined_signals().
+        """
+        p = self.params
+        close, high, low, volume = float(bar['Close']), float(bar['High']), float(bar['Low']), float(bar['Volume BTC'])
+        prev_close = self.prev_close
+
+        # --- RSI ---
+        diff = close - prev_close
+        up = self.rsi_up.update(diff if diff > 0 else 0.0)
+        down = self.rsi_down.update(-diff if diff < 0 else 0.0)
+        rsi = 100 if down == 0 else 100 - (100 / (1 + up / down))
+
+        # --- MACD ---
+        fast, slow = self.ema_fast.update(close), self.ema_slow.update(close)
+        macd = fast - slow
+        macd_sig = self.macd_sig.update(macd)
+        buy_macd, _ = _crossed(self.prev_macd, macd, macd_sig)
+        self.prev_macd = (macd, macd_sig)
+
+        # --- Bollinger ---
+        self.bb.update(close)
+        mavg, mstd = self.bb.mean(), self.bb.std()
+        lower, upper = mavg - p['bb_std'] * mstd, mavg + p['bb_std'] * mstd
+
+        # --- OBV ---
+        self.obv += (close > prev_close) * volume - (close < prev_close) * volume
+        self.obv_ma.update(self.obv)
+        obv_ma = self.obv_ma.mean()
+        buy_obv, _ = _crossed(self.prev_obv, self.obv, obv_ma)
+        self.prev_obv = (self.obv, obv_ma)
+
+        # --- ATR ---
+        true_range = high - low if self.bar == 0 else max(high - low, abs(high - prev_close), abs(low - prev_close))
+        atr = self.atr.update(true_range)
+        self.rolling_high.update(high)
+        self.rolling_low.update(low)
+
+        # --- ADX ---
+        adx, plus_di, minus_di = self._adx(high, low)
+        buy_adx, _ = _crossed(self.prev_di, plus_di, minus_di)
+        self.prev_di = (plus_di, minus_di)
+
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        self.bar += 1
+
+        # --- Combinación de señales ---
+        buy_count = ((rsi < p['rsi_lower']) + buy_macd + (close < lower) + buy_obv
+                     + (close > self.rolling_high.max() - atr * p['atr_mult'])
+                     + (buy_adx and adx >= p['adx_tresh']))
+        sell = rsi > p['rsi_upper'] and close > upper
+        return buy_count >= 2, bool(sell)
@@ -11,9 +11,10 @@ from tqdm import tqdm
 
 from backtest import backtest
 from comparacion import compare_btc_vs_portfolio
+from pipelined_optimization import PipelinedOptimizer
 from results import show_results
 from split import split_dfs
-from walk_forward_objective import walk_forward_objective
+from trial_store import TrialStore, fold_curve_length
 
 
 #######################################################################
@@ -24,8 +25,10 @@ from walk_forward_objective import walk_forward_objective
 # 3. Optimización de hiperparámetros mediante Optuna con validación walk-forward.
 # 4. Evaluación de la estrategia óptima en los tres conjuntos de datos.
 # 5. Visualización de resultados y gráficas de evolución del portafolio.
+# Si save_trials es True, las curvas y métricas de todos los trials se
+# guardan en el directorio 'trials' (ver trial_store.py).
 #######################################################################
-def main():
+def main(save_trials: bool = False):
 
     # --- Definición del número de iteraciones para la optimización ---
     n = 500
@@ -39,14 +42,20 @@ def main():
                                                  train=60, test=20, validation=20)
 
     # --- Configuración y ejecución de la optimización con Optuna ---
+    # Un hilo muestrea parámetros con ask() mientras procesos evaluadores corren walk_forward_objective;
+    # cada proceso calcula los indicadores una sola vez sobre train_df y los comparte entre trials y splits.
+    trial_store_path = None
+    if save_trials:
+        TrialStore.create("trials", n_trials=n, n_folds=3, max_len=fold_curve_length(len(train_df), 3))
+        trial_store_path = "trials"
     optuna.logging.set_verbosity(optuna.logging.WARNING)
-    study = optuna.create_study(direction="maximize")
+    study = optuna.create_study(direction="maximize", sampler=optuna.samplers.TPESampler(constant_liar=True))
     pbar = tqdm(total=n, desc="Optuna optimization", ncols=80)
-    for _ in range(n):
-        study.optimize(lambda trial: walk_forward_objective(trial=trial, data=train_df, n_splits=3),
-                       n_trials=1, catch=(Exception,), n_jobs=-1)
-        pbar.update(1)
+    optimizer = PipelinedOptimizer(study, train_df, n_splits=3, trial_store_path=trial_store_path)
+    stats = optimizer.optimize(n, callback=lambda: pbar.update(1))
     pbar.close()
+    print(f"Trials/s: {stats['trials_per_sec']:.2f} | Muestras/s: {stats['samples_per_sec']:.2f} | "
+          f"Utilización de evaluadores: {stats['evaluator_utilization']:.1%}")
     best_parameters = study.best_params
     best_value = study.best_value
     print("Best Parameters:")
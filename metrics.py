@@ -3,11 +3,12 @@ import pandas as pd
 
 # --- Calcula el Índice de Sharpe anualizado ---
 # Esta función recibe la media y desviación estándar de retornos horarios,
-# y calcula el Sharpe ratio anualizado asumiendo 8760 horas por año.
+# y calcula el Sharpe ratio anualizado asumiendo 8760 horas por año
+# (o `periods` barras por año si se usan otras temporalidades).
 # El Sharpe ratio mide la rentabilidad ajustada por riesgo.
-def annualized_sharpe(mean: float, std: float) -> float:
-    annual_rets = (mean * 8760)
-    annual_std = std * np.sqrt(8760)
+def annualized_sharpe(mean: float, std: float, periods: float = 8760) -> float:
+    annual_rets = (mean * periods)
+    annual_std = std * np.sqrt(periods)
 
     return annual_rets / annual_std if annual_std > 0 else 0
 
@@ -22,8 +23,8 @@ def maximum_drawdown(values: pd.Series) -> float:
 # --- Calcula el Índice de Calmar anualizado ---
 # Combina la rentabilidad anualizada con la máxima pérdida para medir
 # la relación entre retorno y riesgo de caída máxima.
-def annualized_calmar(mean, values) -> float:
-    annual_rets = (mean * 8760)
+def annualized_calmar(mean, values, periods: float = 8760) -> float:
+    annual_rets = (mean * periods)
     max_drawdown = maximum_drawdown(values)
     return annual_rets / max_drawdown if max_drawdown != 0 else 0
 
@@ -37,9 +38,9 @@ def downside_deviation(rets) -> float:
 # --- Calcula el Índice de Sortino anualizado ---
 # Similar al Sharpe, pero utiliza la desviación a la baja para el denominador,
 # enfocándose en el riesgo de pérdidas en lugar de la volatilidad total.
-def annualized_sortino(mean: float, rets) -> float:
-    annual_rets = (mean * 8760)
-    annual_std_down = downside_deviation(rets) * np.sqrt(8760)
+def annualized_sortino(mean: float, rets, periods: float = 8760) -> float:
+    annual_rets = (mean * periods)
+    annual_std_down = downside_deviation(rets) * np.sqrt(periods)
     return annual_rets / annual_std_down if annual_rets > 0 else 0
 
 # --- Calcula la tasa de aciertos (win rate) ---
@@ -50,4 +51,38 @@ def win_rate(rets: pd.Series) -> float:
     if total_trades == 0:
         return 0
     wins = (rets > 0).sum()
-    return wins / total_trades
\ No newline at end of file
+    return wins / total_trades
+
+# --- Estadísticas por operación ---
+# Recibe el arreglo estructurado de TradeLedger.trades y calcula, de forma vectorizada:
+# número de operaciones, tasa de aciertos por operación, profit factor, tiempo promedio
+# en posición (en velas) y exposición (proporción de velas con al menos una posición abierta).
+# Sólo se consideran las operaciones cerradas (SL, TP o cierre al final del backtest).
+def trade_statistics(trades, n_bars: int) -> dict:
+    closed = trades[trades['exit_bar'] >= 0]
+    n_trades = len(closed)
+    if n_trades == 0:
+        return {'Trades': 0, 'Trade Win Rate': 0, 'Profit Factor': 0, 'Avg Holding': 0, 'Exposure': 0}
+
+    pnl = closed['pnl']
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = -pnl[pnl < 0].sum()
+    if gross_loss > 0:
+        profit_factor = gross_profit / gross_loss
+    else:
+        profit_factor = np.inf if gross_profit > 0 else 0
+
+    # Una posición abierta en la vela i y cerrada en la vela j cuenta como abierta en las velas i..j-1
+    holding = closed['exit_bar'] - closed['entry_bar']
+    open_count = np.zeros(n_bars + 1, dtype=np.int64)
+    np.add.at(open_count, closed['entry_bar'], 1)
+    np.add.at(open_count, closed['exit_bar'], -1)
+    exposure = (np.cumsum(open_count[:n_bars]) > 0).mean() if n_bars > 0 else 0
+
+    return {
+        'Trades': n_trades,
+        'Trade Win Rate': (pnl > 0).sum() / n_trades,
+        'Profit Factor': profit_factor,
+        'Avg Holding': holding.mean(),
+        'Exposure': exposure,
+    }
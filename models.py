@@ -1,5 +1,8 @@
 from dataclasses import dataclass
 
+import numpy as np
+import pandas as pd
+
 # --- Propósito del archivo ---
 # Este archivo define la estructura de datos y funciones relacionadas con las operaciones financieras (posiciones)
 # y el cálculo del valor total de un portafolio considerando posiciones largas y cortas.
@@ -16,6 +19,74 @@ class Operation:
     take_profit: float
     n_shares: float
     type: str
+    trade_id: int = -1
+
+# --- Registro columnar de operaciones (trade ledger) ---
+# Cada apertura y cierre se guarda en un arreglo estructurado de NumPy preasignado que crece al doble
+# cuando se llena. Así no se crean objetos de Python por operación y las estadísticas por operación
+# (metrics.trade_statistics) se calculan de forma vectorizada en una sola pasada.
+
+# Lado de la operación y motivo de cierre, codificados como enteros.
+LONG, SHORT = 1, -1
+OPEN, EXIT_SL, EXIT_TP, EXIT_END = 0, 1, 2, 3
+EXIT_REASONS = {OPEN: 'OPEN', EXIT_SL: 'SL', EXIT_TP: 'TP', EXIT_END: 'END'}
+
+TRADE_DTYPE = np.dtype([
+    ('entry_bar', np.int64),
+    ('exit_bar', np.int64),
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('side', np.int8),
+    ('n_shares', np.float64),
+    ('exit_reason', np.int8),
+    ('pnl', np.float64),
+])
+
+
+class TradeLedger:
+    '''
+    Registro de todas las operaciones de un backtest.
+    open() devuelve el identificador de la operación, que se usa después en close().
+    '''
+
+    def __init__(self, capacity: int = 256):
+        self._data = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def trades(self) -> np.ndarray:
+        # Vista de las operaciones registradas (sin copiar).
+        return self._data[:self._size]
+
+    def open(self, bar: int, price: float, side: int, n_shares: float) -> int:
+        if self._size == len(self._data):
+            grown = np.zeros(2 * len(self._data), dtype=TRADE_DTYPE)
+            grown[:self._size] = self._data
+            self._data = grown
+        trade_id = self._size
+        self._data[trade_id] = (bar, -1, price, np.nan, side, n_shares, OPEN, np.nan)
+        self._size += 1
+        return trade_id
+
+    def close(self, trade_id: int, bar: int, price: float, reason: int, pnl: float):
+        row = self._data[trade_id]
+        row['exit_bar'] = bar
+        row['exit_price'] = price
+        row['exit_reason'] = reason
+        row['pnl'] = pnl
+
+    def clear(self):
+        self._size = 0
+
+    def to_frame(self) -> pd.DataFrame:
+        # DataFrame legible con lado y motivo de cierre como texto.
+        frame = pd.DataFrame(self.trades)
+        frame['side'] = np.where(frame['side'] == LONG, 'LONG', 'SHORT')
+        frame['exit_reason'] = frame['exit_reason'].map(EXIT_REASONS)
+        return frame
 
 # --- Función: get_portfolio_value ---
 # Calcula el valor total actual del portafolio, sumando el efectivo disponible y el valor de las posiciones abiertas.
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+from engine import INITIAL_CASH, EngineState, simulate
+from indicators import IndicatorStore, combined_signals
+from metrics import annualized_sharpe
+from models import TradeLedger
+
+# --- Propósito general del archivo ---
+# Este archivo implementa un backtest fuera de memoria (out-of-core) para datasets más grandes que la RAM.
+# Los datos se leen por bloques (chunks) desde un CSV o desde un archivo binario .npy mapeado en memoria.
+# Entre bloques se conservan:
+#   - las últimas `warmup` velas, para que los indicadores del bloque siguiente arranquen "calientes";
+#   - el estado del motor (efectivo y posiciones abiertas);
+#   - acumuladores de las métricas.
+# La memoria máxima depende de chunksize + warmup y no de la longitud del dataset.
+
+# Columnas necesarias para los indicadores y la simulación.
+OHLCV_COLUMNS = ['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume BTC']
+OHLCV_DTYPE = np.dtype([('timestamp', np.int64)] + [(col, np.float64) for col in OHLCV_COLUMNS[1:]])
+
+
+def iter_csv_chunks(path: str, chunksize: int):
+    """
+    Lee un CSV por bloques de `chunksize` filas con las columnas de OHLCV_COLUMNS.
+    El archivo debe estar ordenado de forma ascendente por 'timestamp'
+    (si no lo está, convertirlo antes con csv_to_memmap).
+    """
+    last_ts = None
+    for chunk in pd.read_csv(path, usecols=OHLCV_COLUMNS, chunksize=chunksize):
+        chunk = chunk.dropna()
+        if chunk.empty:
+            continue
+        timestamps = chunk['timestamp'].to_numpy()
+        if (np.diff(timestamps) <= 0).any() or (last_ts is not None and timestamps[0] <= last_ts):
+            raise ValueError("El CSV debe estar ordenado por 'timestamp' ascendente; usa csv_to_memmap().")
+        last_ts = timestamps[-1]
+        yield chunk.reset_index(drop=True)
+
+
+def csv_to_memmap(csv_path: str, npy_path: str, chunksize: int = 100_000) -> int:
+    """
+    Convierte un CSV a un archivo .npy con tipo estructurado OHLCV_DTYPE, sin cargarlo completo.
+    Acepta archivos ordenados de forma ascendente o descendente (como los de Binance);
+    el archivo resultante siempre queda en orden ascendente.
+
+    Returns:
+        int: número de filas escritas.
+    """
+    # --- Primera pasada: número de filas y dirección del orden ---
+    n_rows = 0
+    directions = set()
+    last_ts = None
+    for chunk in pd.read_csv(csv_path, usecols=OHLCV_COLUMNS, chunksize=chunksize):
+        timestamps = chunk.dropna()['timestamp'].to_numpy()
+        if last_ts is not None and len(timestamps):
+            timestamps = np.concatenate([[last_ts], timestamps])
+        directions.update(np.sign(np.diff(timestamps)).tolist())
+        if len(timestamps):
+            last_ts = timestamps[-1]
+        n_rows += len(chunk.dropna())
+    if len(directions - {0}) > 1 or 0 in directions:
+        raise ValueError("El CSV no está ordenado por 'timestamp' (o tiene timestamps repetidos).")
+    descending = directions == {-1}
+
+    # --- Segunda pasada: escritura por bloques ---
+    out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=OHLCV_DTYPE, shape=(n_rows,))
+    pos = 0
+    for chunk in pd.read_csv(csv_path, usecols=OHLCV_COLUMNS, chunksize=chunksize):
+        chunk = chunk.dropna()
+        block = np.empty(len(chunk), dtype=OHLCV_DTYPE)
+        for col in OHLCV_COLUMNS:
+            block[col] = chunk[col].to_numpy()
+        if descending:
+            out[n_rows - pos - len(block):n_rows - pos] = block[::-1]
+        else:
+            out[pos:pos + len(block)] = block
+        pos += len(block)
+    out.flush()
+    del out
+    return n_rows
+
+
+def iter_memmap_chunks(npy_path: str, chunksize: int):
+    # Lee un archivo .npy creado con csv_to_memmap por bloques; sólo el bloque actual se copia a RAM.
+    data = np.load(npy_path, mmap_mode='r')
+    for start in range(0, len(data), chunksize):
+        yield pd.DataFrame(np.array(data[start:start + chunksize]))
+
+
+class StreamingMetrics:
+    '''
+    Acumula las métricas de backtest() sobre la curva del portafolio recibida por bloques.
+    Media y varianza de los retornos se combinan por bloque (algoritmo de Chan et al.),
+    y el drawdown máximo se actualiza con el máximo acumulado, sin guardar la curva completa.
+    '''
+
+    def __init__(self, initial_value: float = INITIAL_CASH):
+        self.last_value = float(initial_value)
+        self.peak = float(initial_value)
+        self.max_drawdown = 0.0
+        self.n_values = 1
+        self.n_rets = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.wins = 0
+        self.n_down = 0
+        self.down_sq = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+
+        # --- Retornos (igual que pct_change) ---
+        rets = values / np.concatenate([[self.last_value], values[:-1]]) - 1
+        self.last_value = values[-1]
+        self.n_values += len(values)
+        self.wins += int((rets > 0).sum())
+        negative = rets[rets < 0]
+        self.n_down += len(negative)
+        self.down_sq += float((negative ** 2).sum())
+
+        # --- Media y varianza combinadas ---
+        n_b = len(rets)
+        mean_b = rets.mean()
+        m2_b = float(((rets - mean_b) ** 2).sum())
+        n = self.n_rets + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta ** 2 * self.n_rets * n_b / n
+        self.n_rets = n
+
+        # --- Drawdown máximo ---
+        roll_max = np.maximum.accumulate(np.concatenate([[self.peak], values]))[1:]
+        self.peak = roll_max[-1]
+        self.max_drawdown = max(self.max_drawdown, float(((roll_max - values) / roll_max).max()))
+
+    def result(self, periods: float = 8760) -> dict:
+        # Devuelve las mismas métricas que engine.performance().
+        mean_t = self.mean if self.n_rets else np.nan
+        std_t = np.sqrt(self.m2 / (self.n_rets - 1)) if self.n_rets > 1 else np.nan
+        downside = np.sqrt(self.down_sq / self.n_down) if self.n_down else np.nan
+        annual_rets = mean_t * periods
+        return {
+            'Portfolio': self.last_value,
+            'Sharpe': annualized_sharpe(mean=mean_t, std=std_t, periods=periods),
+            'Calmar': annual_rets / self.max_drawdown if self.max_drawdown != 0 else 0,
+            'Sortino': annual_rets / (downside * np.sqrt(periods)) if annual_rets > 0 else 0,
+            'Win Rate': self.wins / self.n_values,
+        }
+
+
+def chunked_backtest(source: str, params: dict, chunksize: int = 100_000, warmup: int = 2_000,
+                     keep_curve: bool = False, periods: float = 8760, ledger: TradeLedger = None):
+    """
+    Corre la estrategia sobre un dataset leído por bloques.
+
+    Args:
+        source: ruta a un CSV ordenado o a un .npy creado con csv_to_memmap.
+        params: diccionario con los parámetros de la estrategia.
+        chunksize: filas por bloque.
+        warmup: velas previas que se conservan para calentar los indicadores del bloque siguiente;
+            debe ser mucho mayor que la ventana más grande (los indicadores exponenciales convergen
+            y el resultado coincide con el de una sola pasada en memoria).
+        keep_curve: si True, también devuelve la curva completa del portafolio (ocupa memoria O(n)).
+        periods: barras por año para anualizar.
+        ledger: TradeLedger opcional donde se registran las operaciones (las velas se numeran
+            desde el inicio del dataset; las posiciones abiertas al final quedan abiertas).
+
+    Returns:
+        dict con las métricas de backtest(); si keep_curve=True, tupla (metrics, values_port).
+    """
+    chunks = iter_memmap_chunks(source, chunksize) if source.endswith('.npy') else iter_csv_chunks(source, chunksize)
+
+    state = EngineState(ledger=ledger)
+    stats = StreamingMetrics()
+    curve = [np.array([INITIAL_CASH], dtype=float)] if keep_curve else None
+    history = None
+
+    for chunk in chunks:
+        # --- Indicadores sobre historia + bloque actual ---
+        frame = chunk if history is None else pd.concat([history, chunk], ignore_index=True)
+        buy_signal, sell_signal = combined_signals(IndicatorStore(frame), params)
+        n_new = len(chunk)
+
+        # --- Simulación del bloque con el estado arrastrado ---
+        values, state = simulate(chunk['Close'].to_numpy(dtype=float),
+                                 buy_signal[-n_new:], sell_signal[-n_new:], params, state)
+        stats.update(values)
+        if keep_curve:
+            curve.append(np.asarray(values, dtype=float))
+
+        history = frame.iloc[-warmup:].reset_index(drop=True) if warmup else None
+
+    metrics = stats.result(periods=periods)
+    if keep_curve:
+        return metrics, pd.Series(np.concatenate(curve), name='value')
+    return metrics
+
+
+# --- Ejecución del script ---
+# Convierte el CSV a binario mapeado en memoria y corre los mejores parámetros por bloques.
+if __name__ == "__main__":
+    from prueba_bestparams import BEST_PARAMS
+
+    csv_to_memmap("Binance_BTCUSDT_1h.csv", "Binance_BTCUSDT_1h.npy")
+    print(chunked_backtest("Binance_BTCUSDT_1h.npy", BEST_PARAMS, chunksize=10_000))
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import INITIAL_CASH, EngineState, simulate
+from indicators import StreamingSignals
+from models import TradeLedger
+
+# --- Propósito general del archivo ---
+# Este archivo implementa un ciclo de paper trading con asyncio para medir cuánto tarda la estrategia
+# (signals.py + reglas de backtest.py) desde que llega una vela nueva hasta que toma una decisión.
+#   - Feeds de velas intercambiables: ReplayFeed (se conecta por TCP a un servidor) y DataFrameFeed (en memoria).
+#   - CSVReplayServer: servidor local que transmite Binance_BTCUSDT_1h.csv a una velocidad configurable,
+#     en lugar del exchange.
+#   - PaperTrader: actualiza los indicadores de forma incremental con la vela más reciente
+#     y envía la decisión al broker simulado.
+#   - SimulatedBroker: ejecuta las decisiones con el mismo motor que el backtest y registra las operaciones.
+# Con speed=0 las velas se envían lo más rápido posible, lo que sirve como prueba de estrés de throughput.
+
+BAR_COLUMNS = ['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume BTC']
+
+
+class CSVReplayServer:
+    '''
+    Servidor TCP local que transmite las velas de un CSV como líneas JSON, una por vela.
+    speed es el factor de aceleración respecto al tiempo real (3600 = una vela de 1h por segundo);
+    speed=0 transmite sin pausas.
+    '''
+
+    def __init__(self, path: str = "Binance_BTCUSDT_1h.csv", speed: float = 0, host: str = '127.0.0.1',
+                 port: int = 0, limit: int = None):
+        data = pd.read_csv(path).dropna().sort_values("timestamp").reset_index(drop=True)
+        if limit is not None:
+            data = data.iloc[:limit]
+        self.bars = data[BAR_COLUMNS]
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Con port=0 el sistema asigna un puerto libre
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        timestamps = self.bars['timestamp'].to_numpy()
+        try:
+            for i, row in enumerate(self.bars.itertuples(index=False)):
+                if self.speed > 0 and i > 0:
+                    await asyncio.sleep((timestamps[i] - timestamps[i - 1]) / 1000 / self.speed)
+                writer.write((json.dumps(dict(zip(BAR_COLUMNS, row))) + '\n').encode())
+                # Se vacía el buffer periódicamente para no acumular memoria a máxima velocidad
+                if self.speed > 0 or i % 1000 == 0:
+                    await writer.drain()
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+class ReplayFeed:
+    # Feed que recibe velas de un CSVReplayServer (o de cualquier servidor con el mismo protocolo).
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    async def __aiter__(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=2 ** 20)
+        try:
+            while line := await reader.readline():
+                yield json.loads(line)
+        finally:
+            writer.close()
+
+
+class DataFrameFeed:
+    # Feed en memoria, sin red: útil para medir sólo el costo de la estrategia.
+    def __init__(self, data: pd.DataFrame):
+        self.data = data[BAR_COLUMNS]
+
+    async def __aiter__(self):
+        for row in self.data.itertuples(index=False):
+            yield dict(zip(BAR_COLUMNS, row))
+            await asyncio.sleep(0)
+
+
+class SimulatedBroker:
+    '''
+    Broker simulado: ejecuta cada decisión con engine.simulate (mismas reglas y comisiones que backtest())
+    y guarda las órdenes ejecutadas en un TradeLedger y el valor del portafolio después de cada vela.
+    '''
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.state = EngineState(ledger=TradeLedger())
+        self.values = [INITIAL_CASH]
+
+    async def submit(self, close: float, buy: bool, sell: bool):
+        values, self.state = simulate([close], [buy], [sell], self.params, self.state)
+        self.values.extend(values)
+
+
+class PaperTrader:
+    '''
+    Consume velas de un feed, actualiza las señales con la vela más reciente (StreamingSignals,
+    sin recalcular los indicadores sobre toda la historia) y envía la decisión al broker.
+    Mide la latencia vela → decisión de cada vela.
+    '''
+
+    def __init__(self, params: dict, broker: SimulatedBroker = None):
+        # --- Parámetros ---
+        # params: parámetros de la estrategia.
+        # broker: broker simulado; por defecto uno nuevo con los mismos parámetros.
+        self.params = params
+        self.broker = broker or SimulatedBroker(params)
+        self.signals = StreamingSignals(params)
+        self.latencies_ns = []
+
+    def decide(self, bar: dict):
+        # Señales de compra y venta de la vela recibida.
+        return self.signals.update(bar)
+
+    async def run(self, feed) -> dict:
+        """
+        Corre el ciclo de paper trading hasta que el feed termina.
+
+        Returns:
+            dict: reporte de latencia y throughput (ver latency_report).
+        """
+        start = time.perf_counter()
+        async for bar in feed:
+            received = time.perf_counter_ns()
+            buy, sell = self.decide(bar)
+            self.latencies_ns.append(time.perf_counter_ns() - received)
+            await self.broker.submit(bar['Close'], buy, sell)
+        return latency_report(self.latencies_ns, time.perf_counter() - start, self.broker)
+
+
+def latency_report(latencies_ns: list, elapsed: float, broker: SimulatedBroker) -> dict:
+    # Percentiles de latencia vela → decisión (en milisegundos), throughput y resumen del broker.
+    latencies_ms = np.asarray(latencies_ns, dtype=float) / 1e6
+    if len(latencies_ms) == 0:
+        latencies_ms = np.array([np.nan])
+    return {
+        'bars': len(latencies_ns),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'max_ms': float(np.max(latencies_ms)),
+        'bars_per_sec': len(latencies_ns) / elapsed if elapsed > 0 else np.nan,
+        'trades': len(broker.state.ledger),
+        'portfolio': broker.values[-1],
+    }
+
+
+async def replay(params: dict, path: str = "Binance_BTCUSDT_1h.csv", speed: float = 0,
+                 limit: int = None) -> dict:
+    """
+    Levanta un CSVReplayServer local, conecta un PaperTrader a través de un ReplayFeed
+    y devuelve el reporte de latencia al terminar la transmisión.
+    """
+    server = await CSVReplayServer(path, speed=speed, limit=limit).start()
+    try:
+        trader = PaperTrader(params)
+        return await trader.run(ReplayFeed(server.host, server.port))
+    finally:
+        await server.stop()
+
+
+# --- Ejecución del script ---
+# Replay a máxima velocidad de todo el CSV con los mejores parámetros (prueba de estrés).
+if __name__ == "__main__":
+    from prueba_bestparams import BEST_PARAMS
+
+    report = asyncio.run(replay(BEST_PARAMS, speed=0))
+    for key, value in report.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,179 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import optuna
+import pandas as pd
+
+from indicators import IndicatorStore
+from trial_store import TrialStore, fold_curve_length
+from walk_forward_objective import suggest_params, walk_forward_objective
+
+# --- Propósito general del archivo ---
+# Este archivo implementa un optimizador "pipelined" con study.ask()/study.tell() de Optuna.
+#   - Un hilo muestreador pide trials con study.ask() y llena una cola acotada de parámetros propuestos.
+#   - Procesos evaluadores vacían la cola ejecutando walk_forward_objective con parámetros fijos.
+#   - El hilo principal reporta los resultados a Optuna por lotes con study.tell().
+# Así el muestreo (cuyo costo crece con el número de trials en TPE) se traslapa con la evaluación
+# y los procesos evaluadores no esperan al muestreador. Con varias propuestas pendientes conviene
+# usar TPESampler(constant_liar=True) para que no se repitan regiones ya en evaluación.
+
+# Datos, cache de indicadores y almacén de trials de cada proceso evaluador.
+_worker_data = None
+_worker_store = None
+_worker_trial_store = None
+
+
+def _init_worker(data, trial_store_path):
+    global _worker_data, _worker_store, _worker_trial_store
+    _worker_data = data
+    _worker_store = IndicatorStore(data)
+    _worker_trial_store = TrialStore.open(trial_store_path, mode='r+') if trial_store_path else None
+
+
+def _evaluate(params: dict, number: int, n_splits: int, periods: float = 8760):
+    # Evalúa un conjunto de parámetros; devuelve (valor, error, segundos de evaluación).
+    # El FixedTrial lleva el número del trial real para guardar sus resultados en el TrialStore.
+    start = time.perf_counter()
+    try:
+        value = walk_forward_objective(optuna.trial.FixedTrial(params, number=number), data=_worker_data,
+                                       n_splits=n_splits, store=_worker_store, trial_store=_worker_trial_store,
+                                       periods=periods)
+        error = None
+    except Exception as exc:
+        value, error = None, repr(exc)
+    return value, error, time.perf_counter() - start
+
+
+class PipelinedOptimizer:
+    '''
+    Driver de optimización que traslapa el muestreo de Optuna con la evaluación en paralelo.
+    '''
+
+    def __init__(self, study: optuna.Study, data: pd.DataFrame, n_splits: int = 3, n_workers: int = None,
+                 queue_size: int = None, tell_batch: int = 8, trial_store_path: str = None,
+                 periods: float = 8760):
+        # --- Parámetros ---
+        # study: estudio de Optuna (direction="maximize").
+        # data: DataFrame de entrenamiento para walk_forward_objective.
+        # n_splits: divisiones temporales de walk_forward_objective.
+        # n_workers: procesos evaluadores; por defecto os.cpu_count().
+        # queue_size: propuestas que el muestreador puede adelantar; por defecto 2 * n_workers.
+        # tell_batch: resultados que se acumulan antes de reportarlos con study.tell().
+        # trial_store_path: directorio de un TrialStore ya creado donde guardar curvas y métricas.
+        # periods: velas por año para anualizar las métricas (ver resample.bars_per_year).
+        self.study = study
+        self.data = data
+        self.n_splits = n_splits
+        self.n_workers = n_workers or os.cpu_count()
+        self.queue_size = queue_size or 2 * self.n_workers
+        self.tell_batch = tell_batch
+        self.trial_store_path = trial_store_path
+        self.periods = periods
+
+    def _sample(self, n_trials: int, proposals: queue.Queue, stats: dict):
+        # Hilo muestreador: pide trials a Optuna y los encola (se bloquea si la cola está llena).
+        # Si el muestreo falla, la excepción se encola para que el hilo principal la vuelva a lanzar
+        # en lugar de quedarse esperando propuestas que nunca llegarán.
+        for _ in range(n_trials):
+            trial = None
+            try:
+                start = time.perf_counter()
+                trial = self.study.ask()
+                params = suggest_params(trial)
+                stats['sample_time'] += time.perf_counter() - start
+            except BaseException as exc:
+                if trial is not None:
+                    self.study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                proposals.put(exc)
+                return
+            proposals.put((trial, params))
+
+    def optimize(self, n_trials: int, callback=None) -> dict:
+        """
+        Corre n_trials trials.
+
+        Args:
+            n_trials: número de trials.
+            callback: función opcional que se llama (sin argumentos) al terminar cada trial.
+
+        Returns:
+            dict: trials por segundo, muestras por segundo del muestreador, utilización de los
+            evaluadores y número de trials fallidos.
+        """
+        # Los nuevos trials se numeran a partir de los que ya tiene el estudio
+        if self.trial_store_path:
+            TrialStore.open(self.trial_store_path).check_capacity(
+                len(self.study.trials) + n_trials, self.n_splits, fold_curve_length(len(self.data), self.n_splits))
+
+        proposals = queue.Queue(maxsize=self.queue_size)
+        stats = {'sample_time': 0.0}
+        sampler = threading.Thread(target=self._sample, args=(n_trials, proposals, stats), daemon=True)
+
+        start = time.perf_counter()
+        eval_time = 0.0
+        failed = 0
+        done = 0
+        pending_tell = []
+        in_flight = {}
+        sampler_error = None
+
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                 initargs=(self.data, self.trial_store_path)) as pool:
+            sampler.start()
+            while done < n_trials:
+                # --- Mantener los evaluadores ocupados ---
+                # Se envían propuestas mientras haya menos de 2 por proceso en vuelo.
+                submitted = done + len(in_flight) + len(pending_tell)
+                while sampler_error is None and submitted < n_trials and len(in_flight) < 2 * self.n_workers:
+                    try:
+                        item = proposals.get(block=not in_flight)
+                    except queue.Empty:
+                        break
+                    if isinstance(item, BaseException):
+                        # Se dejan de enviar trials; los que están en vuelo terminan y se reportan
+                        sampler_error = item
+                        break
+                    trial, params = item
+                    future = pool.submit(_evaluate, params, trial.number, self.n_splits, self.periods)
+                    in_flight[future] = trial
+                    submitted += 1
+
+                # --- Recolección de resultados ---
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    trial = in_flight.pop(future)
+                    value, error, seconds = future.result()
+                    eval_time += seconds
+                    pending_tell.append((trial, value, error))
+
+                # --- Reporte a Optuna por lotes ---
+                if len(pending_tell) >= self.tell_batch or not in_flight:
+                    for trial, value, error in pending_tell:
+                        if error is None:
+                            self.study.tell(trial, value)
+                        else:
+                            failed += 1
+                            self.study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                        done += 1
+                        if callback is not None:
+                            callback()
+                    pending_tell = []
+
+                if sampler_error is not None and not in_flight:
+                    break
+
+        sampler.join()
+        if sampler_error is not None:
+            raise sampler_error
+        elapsed = time.perf_counter() - start
+        return {
+            'trials': n_trials,
+            'failed': failed,
+            'trials_per_sec': n_trials / elapsed,
+            'samples_per_sec': n_trials / stats['sample_time'] if stats['sample_time'] > 0 else float('inf'),
+            'evaluator_utilization': eval_time / (elapsed * self.n_workers),
+            'elapsed_sec': elapsed,
+        }
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from engine import INITIAL_CASH, performance, simulate
+from indicators import IndicatorStore, combined_signals, signal_components
+
+# --- Propósito general del archivo ---
+# Este archivo compara el modo de precisión reducida (float32) contra el modo normal (float64).
+# En float32 los precios de entrada, los indicadores y las comparaciones de las señales se hacen en
+# precisión simple; el efectivo y el valor del portafolio se siguen calculando en float64.
+# El reporte cuenta cuántas velas cambian de señal y cuánto cambian las métricas finales,
+# para decidir si el ahorro de memoria vale la pena con nuestros datos.
+
+
+def precision_report(data: pd.DataFrame, params_list: list[dict]) -> pd.DataFrame:
+    """
+    Evalúa cada conjunto de parámetros en float64 y en float32 y compara los resultados.
+
+    Args:
+        data: DataFrame con los datos históricos.
+        params_list: lista de diccionarios de parámetros a comparar.
+
+    Returns:
+        pd.DataFrame: una fila por conjunto de parámetros con el número de velas cuya señal cambia
+        (por señal individual y por señal final), la diferencia de Calmar y de valor final,
+        y la memoria usada por cada cache de indicadores.
+    """
+    store64 = IndicatorStore(data, dtype=np.float64)
+    store32 = IndicatorStore(data, dtype=np.float32)
+    rows = []
+
+    for i, params in enumerate(params_list):
+        row = {'params': i}
+
+        # --- Cambios de señal por indicador ---
+        components64 = signal_components(store64, params)
+        components32 = signal_components(store32, params)
+        for name in components64:
+            row[f'flips_{name}'] = int((components64[name] != components32[name]).sum())
+
+        # --- Cambios en la señal final y en las métricas ---
+        results = {}
+        for label, store in (('64', store64), ('32', store32)):
+            buy_signal, sell_signal = combined_signals(store, params)
+            values, _ = simulate(store.prices, buy_signal, sell_signal, params)
+            results[label] = (buy_signal, sell_signal, performance([INITIAL_CASH] + values))
+
+        row['flips_buy'] = int((results['64'][0] != results['32'][0]).sum())
+        row['flips_sell'] = int((results['64'][1] != results['32'][1]).sum())
+        row['calmar_64'] = results['64'][2]['Calmar']
+        row['calmar_32'] = results['32'][2]['Calmar']
+        row['portfolio_diff'] = results['32'][2]['Portfolio'] - results['64'][2]['Portfolio']
+        rows.append(row)
+
+    report = pd.DataFrame(rows)
+    report['bars'] = len(store64)
+    report['store_mb_64'] = store64.nbytes / 1e6
+    report['store_mb_32'] = store32.nbytes / 1e6
+    return report
+
+
+# --- Ejecución del script ---
+# Reporte de precisión sobre el conjunto de entrenamiento con los mejores parámetros
+# y con una vecindad de parámetros alrededor de ellos.
+if __name__ == "__main__":
+    from prueba_bestparams import BEST_PARAMS
+    from sensitivity import neighborhood_grid
+    from split import split_dfs
+
+    data = pd.read_csv("Binance_BTCUSDT_1h.csv").dropna()
+    data = data.sort_values("timestamp").reset_index(drop=True)
+    train_df, _, _ = split_dfs(data=data, train=60, test=20, validation=20)
+
+    report = precision_report(train_df, neighborhood_grid(BEST_PARAMS, steps=1))
+    print(report.to_string(index=False))
+    print("Velas con señal final distinta:", int(report['flips_buy'].sum() + report['flips_sell'].sum()),
+          "de", int(report['bars'].iloc[0] * len(report) * 2))
@@ -6,6 +6,12 @@ from comparacion import compare_btc_vs_portfolio
 from results import show_results
 from split import split_dfs
 
+# --- Definición de los mejores parámetros obtenidos en la optimización ---
+BEST_PARAMS = {'stop_loss': 0.045762288469242886, 'take_profit': 0.14755127286023728, 'rsi_window': 12, 'rsi_lower': 29,
+               'rsi_upper': 75, 'macd_fast': 8, 'macd_slow': 40, 'macd_signal': 17, 'bb_window': 36, 'bb_std': 3,
+               'obv_window': 38, 'atr_window': 10, 'atr_mult': 1.0527979122714386, 'adx_window': 22, 'adx_tresh': 22,
+               'n_shares': 4.768467501024193}
+
 # --- Función principal para re-ejecutar el backtest con los mejores parámetros obtenidos ---
 def best():
     # --- Carga de datos ---
@@ -15,11 +21,7 @@ def best():
     # --- División del dataset en conjuntos de entrenamiento, prueba y validación ---
     train_df, test_df, validation_df = split_dfs(data=pd.read_csv("Binance_BTCUSDT_1h.csv"),
                                                  train=60, test=20, validation=20)
-    # --- Definición de los mejores parámetros obtenidos en la optimización ---
-    best_parameters = {'stop_loss': 0.045762288469242886, 'take_profit': 0.14755127286023728, 'rsi_window': 12, 'rsi_lower': 29,
-     'rsi_upper': 75, 'macd_fast': 8, 'macd_slow': 40, 'macd_signal': 17, 'bb_window': 36, 'bb_std': 3,
-     'obv_window': 38, 'atr_window': 10, 'atr_mult': 1.0527979122714386, 'adx_window': 22, 'adx_tresh': 22,
-     'n_shares': 4.768467501024193}
+    best_parameters = BEST_PARAMS
 
     # --- Ejecución del backtest con los mejores parámetros en el conjunto de entrenamiento ---
     metric_train, curve_train, results_train = backtest(trial=None, data=train_df, params=best_parameters)
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+# --- Propósito general del archivo ---
+# Este archivo construye velas OHLCV de temporalidades mayores (4h, 1d, ...) a partir de las velas de 1h.
+# Las velas agregadas se guardan en un cache, se actualizan de forma incremental cuando llegan nuevas
+# velas horarias y se pueden alinear de regreso a la serie horaria sin usar información futura.
+# Las velas resultantes conservan las columnas originales ('timestamp', 'Open', 'High', 'Low', 'Close',
+# 'Volume BTC', ...), por lo que las funciones de signals.py y backtest() las aceptan sin cambios;
+# para anualizar bien las métricas se pasa periods=bars_per_year(rule) a backtest(),
+# walk_forward_objective(), engine.fast_backtest(), walk_forward_optimization() o PipelinedOptimizer.
+
+# Duración de una vela base (1h) en milisegundos.
+BASE_MS = 3_600_000
+
+# Reglas de agregación por columna; las columnas ausentes en los datos se ignoran.
+_AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume BTC': 'sum',
+    'Volume USDT': 'sum',
+    'tradecount': 'sum',
+}
+
+
+def timeframe_ms(rule: str) -> int:
+    # Convierte una regla como '4h' o '1D' a milisegundos.
+    return int(pd.Timedelta(rule) / pd.Timedelta(milliseconds=1))
+
+
+def bars_per_year(rule: str) -> float:
+    """
+    Número de velas por año de la temporalidad indicada, para anualizar métricas
+    (8760 para '1h', 2190 para '4h', 365 para '1D').
+    """
+    return 8760 * BASE_MS / timeframe_ms(rule)
+
+
+def resample_ohlcv(data: pd.DataFrame, rule: str, base_ms: int = BASE_MS) -> pd.DataFrame:
+    """
+    Agrega velas de la temporalidad base a la temporalidad `rule`.
+    Los periodos se alinean a la época Unix (las velas diarias empiezan a las 00:00 UTC).
+
+    Args:
+        data: DataFrame horario ordenado con columna 'timestamp' en milisegundos.
+        rule: temporalidad destino, por ejemplo '4h' o '1D'.
+        base_ms: duración de una vela base en milisegundos.
+
+    Returns:
+        pd.DataFrame: una fila por periodo con 'timestamp' (inicio del periodo), las columnas
+        OHLCV agregadas y 'complete', que indica si el periodo ya cerró en los datos recibidos.
+    """
+    tf = timeframe_ms(rule)
+    timestamps = data['timestamp'].to_numpy(dtype=np.int64)
+    buckets = timestamps // tf * tf
+
+    aggregations = {col: how for col, how in _AGGREGATIONS.items() if col in data.columns}
+    bars = data.groupby(buckets, sort=True).agg(aggregations)
+    bars.insert(0, 'timestamp', bars.index.to_numpy(dtype=np.int64))
+    bars = bars.reset_index(drop=True)
+
+    # Un periodo está completo cuando la última vela base recibida ya alcanzó su cierre.
+    last_close = timestamps[-1] + base_ms if len(timestamps) else 0
+    bars['complete'] = bars['timestamp'] + tf <= last_close
+    return bars
+
+
+class TimeframeCache:
+    '''
+    Cache de velas de temporalidad mayor construidas a partir de las velas horarias.
+    Cada temporalidad se agrega una sola vez; update() sólo re-agrega el último periodo abierto.
+    '''
+
+    def __init__(self, data: pd.DataFrame, base_ms: int = BASE_MS):
+        # --- Parámetros ---
+        # data: DataFrame horario con columna 'timestamp' en milisegundos.
+        # base_ms: duración de una vela base en milisegundos.
+        self.data = data.sort_values('timestamp').reset_index(drop=True)
+        self.base_ms = base_ms
+        self._frames = {}
+
+    def get(self, rule: str) -> pd.DataFrame:
+        # Devuelve las velas de la temporalidad `rule`, calculándolas sólo la primera vez.
+        if rule not in self._frames:
+            self._frames[rule] = resample_ohlcv(self.data, rule, self.base_ms)
+        return self._frames[rule]
+
+    def update(self, new_bars: pd.DataFrame):
+        """
+        Agrega nuevas velas horarias y actualiza todas las temporalidades guardadas.
+        Sólo se re-agregan los periodos a partir del último periodo ya existente,
+        que pudo haber quedado incompleto en la actualización anterior.
+        """
+        last_ts = self.data['timestamp'].iloc[-1] if len(self.data) else -1
+        new_bars = new_bars[new_bars['timestamp'] > last_ts].sort_values('timestamp')
+        if new_bars.empty:
+            return
+        self.data = pd.concat([self.data, new_bars], ignore_index=True)
+        timestamps = self.data['timestamp'].to_numpy(dtype=np.int64)
+
+        for rule, bars in self._frames.items():
+            # Se recalcula desde el inicio del último periodo guardado
+            start = bars['timestamp'].iloc[-1] if len(bars) else timestamps[0]
+            first_row = np.searchsorted(timestamps, start, side='left')
+            tail = resample_ohlcv(self.data.iloc[first_row:], rule, self.base_ms)
+            self._frames[rule] = pd.concat([bars.iloc[:-1], tail], ignore_index=True)
+
+    def align(self, values: pd.Series, rule: str, fill_value=None) -> pd.Series:
+        """
+        Alinea valores calculados sobre las velas de `rule` a las velas horarias sin lookahead.
+        El valor de un periodo sólo está disponible a partir de la vela horaria que lo cierra
+        (la última vela horaria del periodo), igual que las señales de backtest() usan el cierre.
+
+        Args:
+            values: serie con la misma longitud y orden que get(rule) (por ejemplo, un indicador o una señal).
+            rule: temporalidad de `values`.
+            fill_value: valor para las horas sin periodo cerrado disponible;
+                por defecto False para señales booleanas y NaN en otro caso.
+
+        Returns:
+            pd.Series: valores alineados con el índice de las velas horarias.
+        """
+        bars = self.get(rule)
+        if len(values) != len(bars):
+            raise ValueError("values debe tener la misma longitud que las velas de la temporalidad.")
+        if fill_value is None:
+            fill_value = False if pd.api.types.is_bool_dtype(values) else np.nan
+
+        # Hora a partir de la cual cada periodo está cerrado
+        available_at = bars['timestamp'].to_numpy(dtype=np.int64) + timeframe_ms(rule) - self.base_ms
+        timestamps = self.data['timestamp'].to_numpy(dtype=np.int64)
+        idx = np.searchsorted(available_at, timestamps, side='right') - 1
+
+        aligned = pd.Series(np.asarray(values)[np.maximum(idx, 0)], index=self.data.index, name=values.name)
+        aligned[idx < 0] = fill_value
+        return aligned
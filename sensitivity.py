@@ -0,0 +1,191 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from engine import fast_backtest
+from indicators import IndicatorStore
+from walk_forward_objective import PARAM_SPACE
+
+# --- Propósito general del archivo ---
+# Este archivo implementa un análisis de sensibilidad de los parámetros de la estrategia.
+# Evalúa una vecindad (un parámetro a la vez) o una malla densa alrededor de los mejores parámetros
+# para saber si el óptimo es un pico aislado o una meseta estable.
+# Cada proceso trabajador construye su propio IndicatorStore una sola vez, de modo que los
+# indicadores se reutilizan entre todos los puntos de la malla que comparten ventanas.
+
+# Parámetros que determinan qué indicadores se calculan; se usan para agrupar los puntos
+# de modo que cada proceso reutilice al máximo su cache de indicadores.
+_WINDOW_PARAMS = ['rsi_window', 'macd_fast', 'macd_slow', 'macd_signal', 'bb_window', 'bb_std',
+                  'obv_window', 'atr_window', 'adx_window']
+
+# Cache de indicadores de cada proceso trabajador.
+_worker_store = None
+
+
+def neighborhood_grid(base_params: dict, steps: int = 3, rel_step: float = 0.05,
+                      names: list = None) -> list[dict]:
+    """
+    Genera una vecindad "un parámetro a la vez" alrededor de base_params.
+    Los enteros se mueven de uno en uno y los flotantes en pasos de rel_step veces su rango,
+    siempre dentro de los límites de PARAM_SPACE.
+
+    Args:
+        base_params: parámetros centrales (por ejemplo, los mejores de Optuna).
+        steps: número de pasos hacia cada lado.
+        rel_step: tamaño del paso para parámetros flotantes, como fracción de su rango.
+        names: parámetros a mover; por defecto todos los de PARAM_SPACE.
+
+    Returns:
+        list[dict]: puntos a evaluar; el primero es base_params.
+    """
+    points = [dict(base_params)]
+    for name in names or PARAM_SPACE:
+        kind, low, high = PARAM_SPACE[name]
+        step = 1 if kind == 'int' else (high - low) * rel_step
+        for k in range(-steps, steps + 1):
+            value = base_params[name] + k * step
+            if k == 0 or value < low or value > high:
+                continue
+            point = dict(base_params)
+            point[name] = value
+            points.append(point)
+    return points
+
+
+def dense_grid(base_params: dict, axes: dict) -> list[dict]:
+    """
+    Genera el producto cartesiano de los valores indicados en axes; el resto de los
+    parámetros se mantiene en base_params.
+
+    Args:
+        base_params: parámetros para las dimensiones que no se mueven.
+        axes: diccionario {parámetro: lista de valores}.
+
+    Returns:
+        list[dict]: puntos a evaluar.
+    """
+    names = list(axes)
+    points = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        point = dict(base_params)
+        point.update(zip(names, values))
+        points.append(point)
+    return points
+
+
+def _init_worker(data, dtype):
+    global _worker_store
+    _worker_store = IndicatorStore(data, dtype=dtype)
+
+
+def _evaluate_chunk(points):
+    rows = []
+    for params in points:
+        _, _, results = fast_backtest(None, params, store=_worker_store)
+        rows.append({**params, **results.iloc[0].to_dict()})
+    return rows
+
+
+def sensitivity_sweep(data: pd.DataFrame, points: list[dict], n_jobs: int = None,
+                      chunksize: int = 32, dtype=np.float64) -> pd.DataFrame:
+    """
+    Evalúa todos los puntos de la malla en paralelo.
+
+    Args:
+        data: DataFrame con los datos históricos.
+        points: lista de diccionarios de parámetros (neighborhood_grid o dense_grid).
+        n_jobs: número de procesos; por defecto os.cpu_count().
+        chunksize: puntos enviados juntos a cada proceso.
+        dtype: precisión del cache de indicadores (np.float32 reduce su memoria a la mitad).
+
+    Returns:
+        pd.DataFrame: una fila por punto con sus parámetros y las métricas de backtest().
+    """
+    # --- Agrupación por ventanas ---
+    # Los puntos que comparten ventanas se envían juntos para reutilizar los indicadores.
+    order = sorted(range(len(points)), key=lambda i: tuple(points[i][k] for k in _WINDOW_PARAMS))
+    ordered = [points[i] for i in order]
+    chunks = [ordered[i:i + chunksize] for i in range(0, len(ordered), chunksize)]
+
+    n_jobs = n_jobs or os.cpu_count()
+    rows = []
+    if n_jobs == 1:
+        _init_worker(data, dtype)
+        for chunk in chunks:
+            rows.extend(_evaluate_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(data, dtype)) as pool:
+            for chunk_rows in pool.map(_evaluate_chunk, chunks):
+                rows.extend(chunk_rows)
+
+    # Se recupera el orden original de los puntos
+    results = pd.DataFrame(rows)
+    results.index = order
+    return results.sort_index()
+
+
+def stability_table(results: pd.DataFrame, base_params: dict, metric: str = 'Calmar') -> pd.DataFrame:
+    """
+    Resume la sensibilidad de la métrica a cada parámetro en un barrido "un parámetro a la vez".
+
+    Returns:
+        pd.DataFrame: por parámetro, métrica base, mínimo, máximo, desviación estándar y la
+        caída relativa máxima respecto al punto base (valores cercanos a 0 indican una meseta).
+    """
+    base_value = results[metric].iloc[0]
+    rows = []
+    for name in PARAM_SPACE:
+        moved = results[~np.isclose(results[name], base_params[name])]
+        if moved.empty:
+            continue
+        values = moved[metric]
+        rows.append({
+            'param': name,
+            'base': base_value,
+            'min': values.min(),
+            'max': values.max(),
+            'std': values.std(),
+            'max_drop %': (base_value - values.min()) / abs(base_value) * 100 if base_value != 0 else np.nan,
+        })
+    return pd.DataFrame(rows).sort_values('max_drop %', ascending=False).reset_index(drop=True)
+
+
+def plot_heatmap(results: pd.DataFrame, x: str, y: str, metric: str = 'Calmar'):
+    """
+    Grafica un mapa de calor de la métrica sobre dos parámetros de una malla densa.
+    Si hay más dimensiones en la malla, se promedia sobre ellas.
+    """
+    table = results.pivot_table(index=y, columns=x, values=metric, aggfunc='mean')
+    plt.figure(figsize=(10, 6))
+    plt.imshow(table.values, aspect='auto', origin='lower', cmap='RdYlGn')
+    plt.colorbar(label=metric)
+    plt.xticks(range(len(table.columns)), np.round(table.columns, 3), rotation=45)
+    plt.yticks(range(len(table.index)), np.round(table.index, 3))
+    plt.xlabel(x)
+    plt.ylabel(y)
+    plt.title(f"Sensibilidad de {metric}: {y} vs {x}")
+    plt.tight_layout()
+    plt.show()
+    return table
+
+
+# --- Ejecución del script ---
+# Barrido de sensibilidad alrededor de los mejores parámetros en el conjunto de entrenamiento.
+if __name__ == "__main__":
+    from prueba_bestparams import BEST_PARAMS
+    from split import split_dfs
+
+    data = pd.read_csv("Binance_BTCUSDT_1h.csv").dropna()
+    data = data.sort_values("timestamp").reset_index(drop=True)
+    train_df, _, _ = split_dfs(data=data, train=60, test=20, validation=20)
+
+    oat = sensitivity_sweep(train_df, neighborhood_grid(BEST_PARAMS))
+    print(stability_table(oat, BEST_PARAMS).to_string(index=False))
+
+    grid = dense_grid(BEST_PARAMS, {'rsi_window': range(10, 31), 'bb_std': [1, 2, 3],
+                                    'atr_mult': np.linspace(1, 2.5, 16)})
+    plot_heatmap(sensitivity_sweep(train_df, grid), x='atr_mult', y='rsi_window')
@@ -0,0 +1,152 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from walk_forward_objective import PARAM_SPACE
+
+# --- Propósito general del archivo ---
+# Este archivo implementa un almacén en disco de los resultados de todos los trials de un estudio.
+# Guarda, en archivos mapeados en memoria:
+#   - curves.npy: matriz float32 con una fila por (trial, split) y la curva del portafolio de ese split;
+#   - table.npy: arreglo estructurado con el número de trial, el split, la longitud de la curva,
+#     los parámetros y las métricas de cada fila.
+# Cada (trial, split) tiene una fila fija (trial * n_folds + fold), así que varios hilos o procesos
+# pueden escribir al mismo tiempo sin candados. El análisis posterior (Sharpe deflactado,
+# probabilidad de sobreajuste, etc.) lee los archivos de forma perezosa sin cargarlos completos.
+
+METRIC_NAMES = ('Portfolio', 'Sharpe', 'Calmar', 'Sortino', 'Win Rate')
+
+
+def fold_curve_length(n: int, n_splits: int) -> int:
+    # Longitud de la curva de cada split de TimeSeriesSplit (n // (n_splits + 1) velas + capital inicial).
+    return n // (n_splits + 1) + 1
+
+
+class TrialStore:
+    '''
+    Almacén mapeado en memoria de curvas, parámetros y métricas por trial y split.
+    Se crea con TrialStore.create() y se abre (en otro proceso o después) con TrialStore.open().
+    '''
+
+    def __init__(self, path: str, mode: str = 'r'):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.n_trials = self.meta['n_trials']
+        self.n_folds = self.meta['n_folds']
+        self.max_len = self.meta['max_len']
+        self.param_names = self.meta['param_names']
+        self.metric_names = self.meta['metric_names']
+        self.curves = np.load(os.path.join(path, 'curves.npy'), mmap_mode=mode)
+        self.table = np.load(os.path.join(path, 'table.npy'), mmap_mode=mode)
+
+    @staticmethod
+    def _table_dtype(param_names, metric_names):
+        return np.dtype([('trial', np.int32), ('fold', np.int16), ('length', np.int32), ('written', np.bool_)]
+                        + [(name, np.float64) for name in param_names]
+                        + [(name, np.float64) for name in metric_names])
+
+    @classmethod
+    def create(cls, path: str, n_trials: int, n_folds: int, max_len: int,
+               param_names=None, metric_names=METRIC_NAMES):
+        """
+        Crea un almacén vacío en el directorio `path`.
+
+        Args:
+            n_trials: número máximo de trials.
+            n_folds: splits por trial.
+            max_len: longitud máxima de cada curva (ver fold_curve_length).
+            param_names: parámetros a guardar; por defecto los de PARAM_SPACE.
+            metric_names: métricas a guardar por split.
+        """
+        param_names = list(param_names or PARAM_SPACE)
+        metric_names = list(metric_names)
+        os.makedirs(path, exist_ok=True)
+        n_rows = n_trials * n_folds
+
+        # Los archivos se crean vacíos (sin escribir ceros); 'written' indica qué filas son válidas.
+        curves = np.lib.format.open_memmap(os.path.join(path, 'curves.npy'), mode='w+',
+                                           dtype=np.float32, shape=(n_rows, max_len))
+        table = np.lib.format.open_memmap(os.path.join(path, 'table.npy'), mode='w+',
+                                          dtype=cls._table_dtype(param_names, metric_names), shape=(n_rows,))
+        table['written'] = False
+        del curves, table
+
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'n_trials': n_trials, 'n_folds': n_folds, 'max_len': max_len,
+                       'param_names': param_names, 'metric_names': metric_names}, f)
+        return cls(path, mode='r+')
+
+    @classmethod
+    def open(cls, path: str, mode: str = 'r'):
+        # Abre un almacén existente ('r' para análisis, 'r+' para que un proceso trabajador escriba).
+        return cls(path, mode=mode)
+
+    def check_capacity(self, n_trials: int, n_folds: int, curve_len: int = 0):
+        """
+        Verifica, antes de optimizar, que el almacén tenga lugar para los trials 0..n_trials-1,
+        n_folds splits y curvas de curve_len valores (ver fold_curve_length). Así un estudio
+        reutilizado o un almacén más chico que la corrida falla al inicio y no trial por trial.
+        """
+        if n_trials > self.n_trials:
+            raise ValueError(f"El TrialStore tiene lugar para {self.n_trials} trials y se necesitan {n_trials}.")
+        if n_folds != self.n_folds:
+            raise ValueError(f"El TrialStore se creó con {self.n_folds} splits y la corrida usa {n_folds}.")
+        if curve_len > self.max_len:
+            raise ValueError(f"Las curvas de {curve_len} valores exceden max_len={self.max_len} del TrialStore.")
+
+    def write(self, trial_number: int, fold: int, curve, params: dict, metrics: dict):
+        """
+        Guarda la curva, los parámetros y las métricas de un split de un trial.
+        La fila es fija para cada (trial, split), por eso no se necesitan candados.
+        """
+        row = trial_number * self.n_folds + fold
+        if trial_number >= self.n_trials or fold >= self.n_folds:
+            raise IndexError("El trial o split excede la capacidad del TrialStore.")
+        curve = np.asarray(curve, dtype=np.float32)
+        if len(curve) > self.max_len:
+            raise ValueError("La curva es más larga que max_len del TrialStore.")
+
+        self.curves[row, :len(curve)] = curve
+        record = self.table[row]
+        record['trial'] = trial_number
+        record['fold'] = fold
+        record['length'] = len(curve)
+        for name in self.param_names:
+            record[name] = params.get(name, np.nan)
+        for name in self.metric_names:
+            record[name] = metrics.get(name, np.nan)
+        # Se marca como escrita al final, cuando la fila ya está completa
+        record['written'] = True
+
+    def flush(self):
+        self.curves.flush()
+        self.table.flush()
+
+    def frame(self) -> pd.DataFrame:
+        # Tabla de parámetros y métricas de las filas escritas.
+        table = self.table[self.table['written']]
+        return pd.DataFrame(table).drop(columns='written')
+
+    def curve(self, trial_number: int, fold: int) -> np.ndarray:
+        # Curva de un split de un trial (vista del archivo, sin copiar).
+        row = trial_number * self.n_folds + fold
+        return self.curves[row, :self.table[row]['length']]
+
+    def iter_fold_curves(self, fold: int, batch: int = 256):
+        """
+        Recorre las curvas de un split por lotes de trials, leyendo del disco sólo el lote actual.
+
+        Yields:
+            tuple: (trial_numbers, curves) con una matriz float32 de forma (trials del lote, longitud).
+        """
+        for start in range(0, self.n_trials, batch):
+            rows = np.arange(start, min(start + batch, self.n_trials)) * self.n_folds + fold
+            written = self.table['written'][rows]
+            rows = rows[written]
+            if len(rows) == 0:
+                continue
+            length = int(self.table['length'][rows].min())
+            yield self.table['trial'][rows], np.asarray(self.curves[rows, :length])
@@ -2,6 +2,8 @@ import numpy as np
 import optuna
 from sklearn.model_selection import TimeSeriesSplit
 from backtest import backtest
+from engine import INITIAL_CASH, performance, simulate
+from indicators import IndicatorStore, combined_signals
 import pandas as pd
 
 # --- Propósito general ---
@@ -10,7 +12,47 @@ import pandas as pd
 # La función evalúa parámetros en diferentes segmentos temporales y devuelve el promedio
 # del Calmar ratio obtenido, permitiendo seleccionar los parámetros óptimos para el backtest.
 
-def walk_forward_objective(trial, data: pd.DataFrame, n_splits: int) -> float:
+# --- Espacio de búsqueda ---
+# Rangos de cada parámetro de la estrategia: (tipo, mínimo, máximo).
+# Se comparte con los módulos de análisis (sensibilidad, re-optimización, etc.)
+# para que todos exploren exactamente el mismo espacio que Optuna.
+PARAM_SPACE = {
+    'stop_loss': ('float', 0.02, 0.05),
+    'take_profit': ('float', 0.04, 0.15),
+    'rsi_window': ('int', 10, 30),
+    'rsi_lower': ('int', 25, 35),
+    'rsi_upper': ('int', 65, 75),
+    'macd_fast': ('int', 5, 12),
+    'macd_slow': ('int', 20, 40),
+    'macd_signal': ('int', 9, 18),
+    'bb_window': ('int', 20, 50),
+    'bb_std': ('int', 1, 3),
+    'obv_window': ('int', 20, 50),
+    'atr_window': ('int', 10, 30),
+    'atr_mult': ('float', 1, 2.5),
+    'adx_window': ('int', 10, 30),
+    'adx_tresh': ('int', 20, 30),
+    'n_shares': ('float', 0.5, 5),
+}
+
+
+def suggest_params(trial) -> dict:
+    """
+    Sugiere un valor para cada parámetro de PARAM_SPACE usando el trial de Optuna.
+    El orden de las sugerencias es el mismo que el de PARAM_SPACE.
+    """
+    params = {}
+    for name, (kind, low, high) in PARAM_SPACE.items():
+        if kind == 'int':
+            params[name] = trial.suggest_int(name, low, high)
+        else:
+            params[name] = trial.suggest_float(name, low, high)
+    return params
+
+
+def walk_forward_objective(trial, data: pd.DataFrame, n_splits: int,
+                           store: IndicatorStore = None, shared_signals: bool = False,
+                           trial_store=None, periods: float = 8760) -> float:
     """
     Función objetivo para Optuna con validación cruzada temporal (walk-forward analysis).
     Evalúa los parámetros propuestos en varios segmentos de tiempo
@@ -20,6 +62,13 @@ def walk_forward_objective(trial, data: pd.DataFrame, n_splits: int) -> float:
         trial: objeto Optuna que genera los parámetros.
         data: DataFrame con los datos históricos.
         n_splits: número de divisiones temporales para la validación cruzada.
+        store: IndicatorStore construido sobre `data`; si se pasa, se usa el modo de señales compartidas.
+        shared_signals: si True, las señales se calculan una sola vez sobre todo `data` y cada split
+            simula sobre su rebanada de las señales, en lugar de recalcular los indicadores desde cero
+            en cada split (y perder las primeras velas por el calentamiento de los indicadores).
+        trial_store: TrialStore opcional donde se guardan la curva, los parámetros y las métricas
+            de cada split para análisis posterior.
+        periods: velas por año para anualizar las métricas (ver resample.bars_per_year).
 
     Returns:
         float: promedio del Calmar ratio en todos los splits.
@@ -27,26 +76,9 @@ def walk_forward_objective(trial, data: pd.DataFrame, n_splits: int) -> float:
 
     # --- Definición de parámetros a optimizar ---
     # Aquí se definen los parámetros que Optuna buscará optimizar.
-    # Cada parámetro es sugerido dentro de un rango específico,
+    # Cada parámetro es sugerido dentro del rango definido en PARAM_SPACE,
     # siguiendo la configuración esperada para el backtest.
-    params = {
-        'stop_loss': trial.suggest_float('stop_loss', 0.02, 0.05),
-        'take_profit': trial.suggest_float('take_profit', 0.04, 0.15),
-        'rsi_window': trial.suggest_int('rsi_window', 10, 30),
-        'rsi_lower': trial.suggest_int('rsi_lower', 25, 35),
-        'rsi_upper': trial.suggest_int('rsi_upper', 65, 75),
-        'macd_fast': trial.suggest_int('macd_fast', 5, 12),
-        'macd_slow': trial.suggest_int('macd_slow', 20, 40),
-        'macd_signal': trial.suggest_int('macd_signal', 9, 18),
-        'bb_window': trial.suggest_int('bb_window', 20, 50),
-        'bb_std': trial.suggest_int('bb_std', 1, 3),
-        'obv_window': trial.suggest_int('obv_window', 20, 50),
-        'atr_window': trial.suggest_int('atr_window', 10, 30),
-        'atr_mult': trial.suggest_float('atr_mult', 1, 2.5),
-        'adx_window': trial.suggest_int('adx_window', 10, 30),
-        'adx_tresh': trial.suggest_int('adx_tresh', 20, 30),
-        'n_shares': trial.suggest_float('n_shares', 0.5, 5),
-    }
+    params = suggest_params(trial)
 
     # --- Configuración de la validación cruzada temporal ---
     # Se utiliza TimeSeriesSplit para dividir los datos en n_splits segmentos
@@ -55,14 +87,35 @@ def walk_forward_objective(trial, data: pd.DataFrame, n_splits: int) -> float:
     tscv = TimeSeriesSplit(n_splits=n_splits)
     scores = []
 
+    # --- Modo de señales compartidas ---
+    # Los indicadores se toman del store (calculados sobre toda la serie de entrenamiento)
+    # y cada split sólo simula sobre su rebanada de las señales ya calculadas.
+    if store is not None or shared_signals:
+        if store is None:
+            store = IndicatorStore(data)
+        elif len(store) != len(data):
+            raise ValueError("El IndicatorStore debe construirse sobre el mismo DataFrame que data.")
+        buy_signal, sell_signal = combined_signals(store, params)
+        for fold, (_, test_idx) in enumerate(tscv.split(data)):
+            values, _ = simulate(store.prices[test_idx], buy_signal[test_idx],
+                                 sell_signal[test_idx], params)
+            curve = [INITIAL_CASH] + values
+            stats = performance(curve, periods=periods)
+            if trial_store is not None:
+                trial_store.write(trial.number, fold, curve, params, stats)
+            scores.append(stats['Calmar'])
+        return float(np.mean(scores))
+
     # --- Evaluación de cada split temporal ---
     # Para cada segmento de prueba generado por TimeSeriesSplit,
     # se ejecuta el backtest con los parámetros actuales y se calcula el Calmar ratio.
-    for _, test_idx in tscv.split(data):
+    for fold, (_, test_idx) in enumerate(tscv.split(data)):
         test_data = data.iloc[test_idx].reset_index(drop=True)
 
         # Ejecuta tu backtest con los parámetros del trial actual
-        calmar, _, _ = backtest(trial=None, data=test_data, params=params)
+        calmar, curve, results = backtest(trial=None, data=test_data, params=params, periods=periods)
+        if trial_store is not None:
+            trial_store.write(trial.number, fold, curve.to_numpy(), params, results.iloc[0].to_dict())
 
         # Guarda la métrica Calmar obtenida en este split
         scores.append(calmar)
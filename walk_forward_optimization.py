@@ -0,0 +1,230 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import optuna
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from engine import INITIAL_CASH, EngineState, performance, simulate
+from indicators import IndicatorStore, combined_signals
+from walk_forward_objective import walk_forward_objective
+
+# --- Propósito general del archivo ---
+# Este archivo implementa la re-optimización walk-forward: una ventana de entrenamiento se desliza
+# (o se ancla al inicio) a lo largo de los datos, en cada ventana se corre un estudio de Optuna y
+# los mejores parámetros se evalúan fuera de muestra en la ventana siguiente. Las curvas fuera de
+# muestra se encadenan para obtener la curva que habría tenido una estrategia re-optimizada en producción.
+# Warm start encadenado: el estudio de cada ventana se divide en dos etapas.
+#   1. Exploración: unos pocos trials (early_n_trials) que empiezan con los mejores trials de la
+#      exploración de la ventana anterior (información siempre pasada). Esta etapa es secuencial y
+#      corre en un proceso dedicado, ya que es la cadena de la que depende la ventana siguiente.
+#   2. Refinamiento: el resto de los trials de la ventana continúa el mismo estudio y, al terminar,
+#      evalúa el óptimo fuera de muestra. Estas etapas corren en paralelo en n_jobs procesos.
+# Con un early_n_trials más grande el warm start de cada ventana es mejor, pero la parte secuencial
+# (la exploración de todas las ventanas) se alarga y se aprovecha menos el paralelismo.
+# Al terminar los estudios, las ventanas fuera de muestra se simulan en orden con un único estado
+# (efectivo y posiciones abiertas), como lo haría la estrategia en producción al cambiar de parámetros.
+
+
+def walk_forward_windows(n: int, train_size: int, test_size: int, step: int = None,
+                         anchored: bool = False) -> list[tuple[slice, slice]]:
+    """
+    Genera las ventanas de entrenamiento y prueba sobre n filas.
+
+    Args:
+        n: número de filas del dataset.
+        train_size: filas de la ventana de entrenamiento (la primera, si anchored=True).
+        test_size: filas de la ventana fuera de muestra.
+        step: desplazamiento entre ventanas; por defecto test_size. Debe ser al menos test_size
+            para que las ventanas fuera de muestra no se traslapen (si es mayor quedan huecos
+            sin evaluar entre ventanas).
+        anchored: si True, el entrenamiento siempre empieza en la fila 0 y crece en cada ventana.
+
+    Returns:
+        list: tuplas (train_slice, test_slice).
+    """
+    step = step or test_size
+    if step < test_size:
+        # Con ventanas fuera de muestra traslapadas no existe una única curva encadenada
+        raise ValueError("step debe ser mayor o igual que test_size (ventanas fuera de muestra sin traslape).")
+    windows = []
+    train_end = train_size
+    while train_end + test_size <= n:
+        train_start = 0 if anchored else train_end - train_size
+        windows.append((slice(train_start, train_end), slice(train_end, train_end + test_size)))
+        train_end += step
+    return windows
+
+
+def _out_of_sample(span_df, train_len, params):
+    # Los indicadores se calculan sobre entrenamiento + prueba contiguos y sólo se devuelve la parte
+    # de prueba, así las primeras velas fuera de muestra no pierden señales por el calentamiento.
+    # Devuelve (precios, señales de compra, señales de venta) para simularlos con replay_out_of_sample.
+    store = IndicatorStore(span_df)
+    buy_signal, sell_signal = combined_signals(store, params)
+    return store.prices[train_len:], buy_signal[train_len:], sell_signal[train_len:]
+
+
+def _run_study(train_df, seeds, trials, n_trials, n_splits, seed, periods):
+    # Corre n_trials trials nuevos en un estudio que parte de `trials` (FrozenTrials ya evaluados)
+    # y encola los parámetros de `seeds` como primeros trials (warm start).
+    # Devuelve todos los trials del estudio para poder continuarlo en otro proceso.
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(direction="maximize", sampler=optuna.samplers.TPESampler(seed=seed))
+    study.add_trials(trials)
+    for params in seeds:
+        study.enqueue_trial(params)
+    if n_trials > 0:
+        store = IndicatorStore(train_df)
+        study.optimize(lambda trial: walk_forward_objective(trial=trial, data=train_df, n_splits=n_splits,
+                                                            store=store, periods=periods),
+                       n_trials=n_trials, catch=(Exception,))
+    return study.trials
+
+
+def _top_trials(trials, top_k):
+    completed = [t for t in trials if t.state == optuna.trial.TrialState.COMPLETE]
+    return sorted(completed, key=lambda t: t.value, reverse=True)[:top_k]
+
+
+def _explore_window(span_df, train_len, seeds, n_trials, n_splits, seed, periods):
+    # --- Etapa 1: exploración con warm start ---
+    # span_df contiene la ventana de entrenamiento (primeras train_len filas) seguida de la de prueba.
+    return _run_study(span_df.iloc[:train_len], seeds, [], n_trials, n_splits, seed, periods)
+
+
+def _finish_window(span_df, train_len, trials, n_trials, n_splits, seed, periods):
+    # --- Etapa 2: refinamiento y evaluación fuera de muestra ---
+    trials = _run_study(span_df.iloc[:train_len], [], trials, n_trials, n_splits, seed, periods)
+    top = _top_trials(trials, 1)
+    if not top:
+        raise ValueError("Ningún trial de la ventana terminó correctamente.")
+    best = top[0]
+    return {
+        'best_params': best.params,
+        'best_value': best.value,
+        'signals': _out_of_sample(span_df, train_len, best.params),
+    }
+
+
+def replay_out_of_sample(signals: list, params: list, indexes: list, periods: float = 8760):
+    """
+    Simula las ventanas fuera de muestra en orden con un único EngineState: el efectivo y las
+    posiciones abiertas (cada una con su stop loss y take profit) pasan de una ventana a la
+    siguiente, y en cada ventana se operan las señales y parámetros de su óptimo.
+
+    Args:
+        signals: tuplas (precios, señales de compra, señales de venta) de cada ventana (ver _out_of_sample).
+        params: mejores parámetros de cada ventana.
+        indexes: índices de las filas de prueba de cada ventana; deben ser crecientes y sin traslape.
+        periods: velas por año para anualizar oos_calmar (ver resample.bars_per_year).
+
+    Returns:
+        tuple: (equity, windows) con la curva fuera de muestra encadenada y, por ventana,
+        un diccionario con 'oos_calmar' y 'oos_return %' medidos sobre su tramo de la curva.
+    """
+    state = EngineState()
+    pieces = []
+    windows = []
+    start_value = INITIAL_CASH
+    last = None
+    for (prices, buy_signal, sell_signal), window_params, index in zip(signals, params, indexes):
+        if last is not None and index[0] <= last:
+            raise ValueError("Las ventanas fuera de muestra se traslapan; no se pueden encadenar.")
+        last = index[-1]
+        values, state = simulate(prices, buy_signal, sell_signal, window_params, state)
+        windows.append({
+            'oos_calmar': performance([start_value] + values, periods=periods)['Calmar'],
+            'oos_return %': (values[-1] / start_value - 1) * 100,
+        })
+        pieces.append(pd.Series(values, index=index))
+        start_value = values[-1]
+    return pd.concat(pieces), windows
+
+
+def walk_forward_optimization(data: pd.DataFrame, train_size: int, test_size: int, step: int = None,
+                              anchored: bool = False, n_trials: int = 100, warm_n_trials: int = None,
+                              early_n_trials: int = None, n_splits: int = 3, top_k: int = 5,
+                              n_jobs: int = None, seed: int = None, periods: float = 8760):
+    """
+    Re-optimiza la estrategia en ventanas sucesivas y evalúa cada óptimo fuera de muestra.
+
+    Args:
+        data: DataFrame con los datos históricos ordenados por 'timestamp'.
+        train_size, test_size, step, anchored: definición de las ventanas (ver walk_forward_windows).
+        n_trials: trials de la primera ventana (sin warm start).
+        warm_n_trials: trials de cada ventana siguiente (con warm start); por defecto n_trials // 2.
+        early_n_trials: trials de la etapa de exploración de cada ventana, de la que sale el warm start
+            de la ventana siguiente; por defecto max(2 * top_k, warm_n_trials // 4).
+        n_splits: divisiones de walk_forward_objective dentro de cada ventana de entrenamiento.
+        top_k: número de mejores trials de la exploración que se pasan a la ventana siguiente.
+        n_jobs: procesos para la etapa de refinamiento; por defecto os.cpu_count() - 1
+            (la exploración usa un proceso adicional).
+        seed: semilla del sampler (se deriva una por ventana y etapa).
+        periods: velas por año para anualizar las métricas (ver resample.bars_per_year).
+
+    Returns:
+        tuple: (summary, equity) con un DataFrame de resultados por ventana y la curva
+        fuera de muestra encadenada.
+    """
+    windows = walk_forward_windows(len(data), train_size, test_size, step, anchored)
+    if not windows:
+        raise ValueError("No hay datos suficientes para una ventana de entrenamiento y prueba.")
+    n_jobs = n_jobs or max((os.cpu_count() or 2) - 1, 1)
+    warm_n_trials = warm_n_trials or max(n_trials // 2, top_k)
+    early_n_trials = early_n_trials or max(2 * top_k, warm_n_trials // 4)
+
+    futures = []
+    seeds = []
+    with ProcessPoolExecutor(max_workers=1) as explorer, ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        for i, (train_slice, test_slice) in enumerate(windows):
+            span_df = data.iloc[train_slice.start:test_slice.stop].reset_index(drop=True)
+            train_len = train_slice.stop - train_slice.start
+            total = n_trials if i == 0 else warm_n_trials
+            early = min(early_n_trials, total)
+            window_seed = None if seed is None else seed + 2 * i
+
+            # --- Cadena de warm start ---
+            # La exploración de la ventana i empieza con los mejores trials de la exploración de la
+            # ventana i - 1; mientras tanto, el refinamiento de las ventanas anteriores sigue en `pool`.
+            explored = explorer.submit(_explore_window, span_df, train_len, seeds, early, n_splits,
+                                       window_seed, periods).result()
+            seeds = [t.params for t in _top_trials(explored, top_k)]
+            futures.append(pool.submit(_finish_window, span_df, train_len, explored, total - early, n_splits,
+                                       None if seed is None else window_seed + 1, periods))
+        outputs = [f.result() for f in futures]
+
+    # --- Simulación fuera de muestra encadenada ---
+    equity, oos = replay_out_of_sample([out['signals'] for out in outputs],
+                                       [out['best_params'] for out in outputs],
+                                       [data.index[test_slice] for _, test_slice in windows], periods)
+
+    # --- Resumen por ventana ---
+    summary = pd.DataFrame([{
+        'train_start': train_slice.start,
+        'train_end': train_slice.stop,
+        'test_end': test_slice.stop,
+        'in_sample_calmar': out['best_value'],
+        **window_oos,
+        **out['best_params'],
+    } for (train_slice, test_slice), out, window_oos in zip(windows, outputs, oos)])
+    return summary, equity
+
+
+# --- Ejecución del script ---
+# Re-optimización con un año de entrenamiento y tres meses fuera de muestra.
+if __name__ == "__main__":
+    data = pd.read_csv("Binance_BTCUSDT_1h.csv").dropna()
+    data = data.sort_values("timestamp").reset_index(drop=True)
+
+    summary, equity = walk_forward_optimization(data, train_size=24 * 365, test_size=24 * 90, n_trials=100)
+    print(summary.to_string(index=False))
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(equity.index, equity.values, label="Walk-forward (fuera de muestra)", color='purple', linewidth=2)
+    plt.title("Evolución del Portafolio re-optimizado")
+    plt.xlabel("Tiempo (horas)")
+    plt.ylabel("Valor del Portafolio")
+    plt.legend()
+    plt.grid(True)
+    plt.show()